@@ -1,10 +1,8 @@
 import streamlit as st
-from chains import first_responder, final_responder, global_responder, salary_responder, vacancy_responder
-from langgraph.graph import MessageGraph
-from classes import FinalResponse
+from graph import create_graph, stream_turn
 from services.Intranet_repository_s3 import IntranetRepository
 import json
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage
 import os
 import time
 from dotenv import load_dotenv
@@ -95,25 +93,12 @@ def upload_file_to_s3(bucket_name, file_object, object_name=None):
         return False
 
 # Função para visualizar conteúdo de um arquivo S3
-def view_s3_file_content(bucket_name, file_key):
+def view_s3_file_content(repository, file_key):
     """
-    Retrieve and display content of a file from S3
+    Retrieve the content of a file from S3 in memory
     """
-    s3_client = boto3.client('s3')
     try:
-        # Baixar arquivo do S3
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            s3_client.download_file(bucket_name, file_key, temp_file.name)
-            temp_file_path = temp_file.name
-        
-        # Ler conteúdo do arquivo
-        with open(temp_file_path, 'r') as f:
-            content = f.read()
-        
-        # Limpar arquivo temporário
-        os.remove(temp_file_path)
-        
-        return content
+        return repository.fetch_object_text(file_key)
     except Exception as e:
         print(f"Error retrieving file from S3: {e}")
         return f"Erro ao recuperar arquivo: {str(e)}"
@@ -143,9 +128,14 @@ def diagnose_faiss_index(repository):
                 st.warning("Não foi possível determinar o tamanho do índice.")
             
             # Listar metadados de documentos
+            docs_list = None
             if hasattr(repository._vectorstore, 'docstore') and hasattr(repository._vectorstore.docstore, '_dict'):
-                st.subheader("Documentos Indexados:")
                 docs_list = list(repository._vectorstore.docstore._dict.values())
+            elif hasattr(repository._vectorstore, 'get_document'):
+                # Índice compacto (mmap): os documentos são lidos linha a linha
+                docs_list = [repository._vectorstore.get_document(row) for row in range(repository._vectorstore.index.ntotal)]
+            if docs_list is not None:
+                st.subheader("Documentos Indexados:")
                 
                 # Agrupe por fonte
                 source_counts = {}
@@ -169,11 +159,12 @@ def diagnose_faiss_index(repository):
         except Exception as e:
             st.error(f"Erro ao analisar índice: {str(e)}")
 
-# Função de reindexação forçada completa
 # Função de reindexação forçada completa
 def force_full_reindex(repository, bucket_name):
     """
-    Force complete reindexing of documents from S3 bucket with detailed steps
+    Force complete reindexing of documents from S3 bucket with detailed steps.
+    The new index is built into a new version and published atomically, so the
+    chat keeps using the current index during the rebuild.
     """
     st.sidebar.subheader("Reindexação Forçada")
     
@@ -181,85 +172,72 @@ def force_full_reindex(repository, bucket_name):
         with st.sidebar:
             with st.spinner("Reindexando documentos..."):
                 try:
-                    st.info("1. Removendo índice existente...")
-                    
-                    # Método mais seguro e explícito para remover os arquivos do índice FAISS
-                    index_path = "faiss_index"
-                    index_files = [
-                        os.path.join(index_path, "index.faiss"),
-                        os.path.join(index_path, "index.pkl")
-                    ]
-                    
-                    # Verificar e remover cada arquivo individualmente
-                    for file_path in index_files:
-                        if os.path.exists(file_path):
-                            try:
-                                os.remove(file_path)
-                                st.success(f"Arquivo {file_path} removido com sucesso.")
-                            except Exception as e:
-                                st.error(f"Erro ao remover {file_path}: {str(e)}")
-                    
-                    # Verificar se o diretório existe e está vazio e então removê-lo
-                    if os.path.exists(index_path) and os.path.isdir(index_path):
-                        if not os.listdir(index_path):  # Se o diretório estiver vazio
-                            try:
-                                os.rmdir(index_path)
-                                st.success(f"Diretório {index_path} removido com sucesso.")
-                            except Exception as e:
-                                st.error(f"Erro ao remover diretório {index_path}: {str(e)}")
-                    
-                    # Reset the singleton instance
-                    st.info("2. Reiniciando instância do repositório...")
-                    repository._vectorstore = None
-                    
-                    # Limpar a referência global
-                    if "repository" in st.session_state:
-                        st.session_state.repository = None
+                    previous_version = repository.get_index_version()
+                    st.info(f"1. Versão atual do índice: {previous_version or 'nenhuma'}")
                     
                     # Listar documentos no bucket
-                    s3_client = boto3.client('s3')
-                    response = s3_client.list_objects_v2(Bucket=bucket_name)
-                    
-                    if 'Contents' in response:
-                        doc_count = len(response['Contents'])
-                        st.info(f"3. Encontrados {doc_count} documentos no bucket S3.")
-                        
-                        # Listar documentos
-                        for item in response['Contents']:
-                            st.write(f"- {item['Key']} ({item['Size']} bytes)")
+                    documents = repository.list_documents_in_bucket()
+                    if documents:
+                        st.info(f"2. Encontrados {len(documents)} documentos no bucket S3.")
+                        for document in documents:
+                            st.write(f"- {document}")
                     else:
                         st.warning("Nenhum documento encontrado no bucket S3.")
                     
-                    # Recreate the index with a new repository instance
-                    st.info("4. Criando novo índice FAISS...")
+                    # Construir nova versão do índice (o índice atual continua ativo)
+                    st.info("3. Criando nova versão do índice FAISS...")
                     start_time = time.time()
-                    
-                    # Criar nova instância do repositório
-                    new_repository = IntranetRepository(bucket_name=bucket_name)
-                    
-                    # Forçar reconstrução do índice
-                    vectorstore = new_repository.force_rebuild_index()
+                    vectorstore = repository.force_rebuild_index()
                     elapsed_time = time.time() - start_time
                     
-                    # Atualizar referência na sessão
-                    st.session_state.repository = new_repository
-                    
-                    # Verificar se o índice foi criado
                     if vectorstore is not None:
-                        st.success(f"Índice FAISS criado com sucesso em {elapsed_time:.2f} segundos.")
-                        
-                        # Verificar se o índice foi salvo corretamente
-                        if os.path.exists(os.path.join(index_path, "index.faiss")) and \
-                           os.path.exists(os.path.join(index_path, "index.pkl")):
-                            st.success("Arquivos do índice verificados e estão presentes no disco.")
-                        else:
-                            st.warning("Os arquivos do índice podem não ter sido salvos corretamente.")
+                        st.success(
+                            f"Índice FAISS publicado como {repository.get_index_version()} "
+                            f"em {elapsed_time:.2f} segundos."
+                        )
                     else:
-                        st.error("Falha ao criar índice FAISS.")
+                        st.error("Falha ao criar índice FAISS. A versão anterior continua ativa.")
                 except Exception as e:
                     st.error(f"Erro ao reindexar documentos: {str(e)}")
                     st.error(f"Detalhes: {type(e).__name__}")
 
+    if st.sidebar.button("Restaurar Versão Anterior do Índice"):
+        with st.sidebar:
+            try:
+                if repository.rollback_index() is not None:
+                    st.success(f"Índice restaurado para a versão {repository.get_index_version()}.")
+                else:
+                    st.warning("Nenhuma versão anterior disponível.")
+            except Exception as e:
+                st.error(f"Erro ao restaurar índice: {str(e)}")
+
+# Função de sincronização incremental
+def sync_index_section(repository):
+    """
+    Incrementally sync the FAISS index with the S3 bucket (only new, changed or removed files)
+    """
+    st.sidebar.subheader("Sincronização Incremental")
+
+    if st.sidebar.button("Sincronizar Índice com S3"):
+        with st.sidebar:
+            with st.spinner("Sincronizando documentos..."):
+                try:
+                    start_time = time.time()
+                    summary = repository.sync_index()
+                    elapsed_time = time.time() - start_time
+
+                    if summary.get('full_rebuild'):
+                        st.info("Manifesto não encontrado: índice reconstruído por completo.")
+                    else:
+                        st.info(
+                            f"Novos: {summary['added']}, alterados: {summary['updated']}, "
+                            f"removidos: {summary['removed']}, inalterados: {summary['unchanged']}"
+                        )
+                        st.info(f"Chunks adicionados: {summary['chunks_added']}, removidos: {summary['chunks_deleted']}")
+                    st.success(f"Sincronização concluída em {elapsed_time:.2f} segundos.")
+                except Exception as e:
+                    st.error(f"Erro ao sincronizar índice: {str(e)}")
+
 # Função de upload de documentos
 def upload_document_section(bucket_name):
     """
@@ -283,14 +261,14 @@ def upload_document_section(bucket_name):
                     
                     if success:
                         st.success(f"Documento '{object_name}' enviado com sucesso!")
-                        st.info("Por favor, reindexe os documentos para incluir o novo arquivo.")
+                        st.info("Por favor, sincronize ou reindexe os documentos para incluir o novo arquivo.")
                     else:
                         st.error("Erro ao enviar o documento. Verifique os logs para mais detalhes.")
             else:
                 st.warning("Por favor, selecione um arquivo para enviar.")
 
 # Função para explorar documentos do bucket
-def explore_s3_documents(bucket_name):
+def explore_s3_documents(repository):
     """
     Explorar e visualizar o conteúdo de documentos armazenados no bucket S3
     """
@@ -298,13 +276,11 @@ def explore_s3_documents(bucket_name):
     
     with st.sidebar.expander("Ver Documentos do S3"):
         try:
-            # Listar documentos no bucket
-            s3_client = boto3.client('s3')
-            response = s3_client.list_objects_v2(Bucket=bucket_name)
+            # Listar documentos no bucket (todas as páginas)
+            doc_options = repository.list_documents_in_bucket()
             
-            if 'Contents' in response:
+            if doc_options:
                 # Criar seletor de documento
-                doc_options = [item['Key'] for item in response['Contents']]
                 selected_doc = st.selectbox("Selecione um documento para visualizar:", doc_options)
                 
                 if selected_doc:
@@ -313,7 +289,7 @@ def explore_s3_documents(bucket_name):
                     # Botão para visualizar conteúdo
                     if st.button("Visualizar Conteúdo"):
                         with st.spinner("Carregando conteúdo..."):
-                            content = view_s3_file_content(bucket_name, selected_doc)
+                            content = view_s3_file_content(repository, selected_doc)
                             st.text_area("Conteúdo do Documento:", value=content, height=300)
             else:
                 st.warning("Nenhum documento encontrado no bucket.")
@@ -360,36 +336,6 @@ def show_admin_button():
             st.session_state.show_login = True
             st.rerun()
 
-def create_graph():
-    builder = MessageGraph()
-    builder.add_node("classifier", first_responder)
-    builder.add_node("global", global_responder)
-    builder.add_node("salary", salary_responder)
-    builder.add_node("vacancy", vacancy_responder)
-    builder.add_node("final", final_responder)
-    builder.add_conditional_edges("classifier", decision_flow)
-    builder.add_edge("global", "final")
-    builder.add_edge("salary", "final")
-    builder.add_edge("vacancy", "final")
-    builder.set_entry_point("classifier")
-    return builder.compile()
-
-def decision_flow(state: list[BaseMessage]) -> str:
-    last_message = state[-1]
-    if hasattr(last_message, 'additional_kwargs') and 'tool_calls' in last_message.additional_kwargs:
-        tool_calls = last_message.additional_kwargs['tool_calls']
-        if tool_calls:
-            last_tool = tool_calls[-1]
-            arguments = last_tool['function']['arguments']
-            result = json.loads(arguments)
-            if result.get("request_type") == "global_question":
-                return "global"
-            elif result.get("request_type") == "salary_request":
-                return "salary"
-            elif result.get("request_type") == "vacancy_request":
-                return "vacancy"
-    return "final"
-
 # Inicializar variáveis de estado
 if "show_login" not in st.session_state:
     st.session_state.show_login = False
@@ -455,7 +401,7 @@ else:
                     st.write("Nenhum documento encontrado no bucket.")
             
             # Adicionar funcionalidade de exploração
-            explore_s3_documents(BUCKET_NAME)
+            explore_s3_documents(repository)
             
             # Adicionar funcionalidade de upload
             upload_document_section(BUCKET_NAME)
@@ -463,6 +409,9 @@ else:
             # Adicionar diagnóstico do índice
             diagnose_faiss_index(repository)
             
+            # Adicionar sincronização incremental
+            sync_index_section(repository)
+
             # Adicionar reindexação forçada
             force_full_reindex(repository, BUCKET_NAME)
         
@@ -489,20 +438,24 @@ if not st.session_state.show_login or st.session_state.authenticated:
         st.session_state.history.append(HumanMessage(content=query))
         MAX_HISTORY = 10
         st.session_state.history = st.session_state.history[-MAX_HISTORY:]
-        try:
-            # Usando container vazio para evitar mostrar o spinner na área de chat
-            with st.empty():
-                # Usar o grafo da session_state para evitar problemas
-                response = st.session_state.graph.invoke(st.session_state.history)
-
-                final_result_json = response[-1].content
-                final_result_pydantic = FinalResponse.model_validate_json(final_result_json)
-                answer = final_result_pydantic.answer
+        with st.chat_message("user"):
+            st.markdown(query)
 
+        # Mostrar a resposta token a token enquanto o modelo gera;
+        # o FinalResponse montado no fim é o que vai para o histórico
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            streamed = ""
+            try:
+                for kind, value in stream_turn(st.session_state.graph, st.session_state.history):
+                    if kind == "token":
+                        streamed += value
+                        placeholder.markdown(streamed + "▌")
+                    else:
+                        answer = value.answer
+                placeholder.markdown(answer)
                 st.session_state.history.append(AIMessage(content=answer))
-                
-                # Recarregar a página para mostrar a nova mensagem
-                st.rerun()
-        except Exception as e:
-            st.session_state.history.append(AIMessage(content=f"Ocorreu um erro: {str(e)}"))
-            st.rerun()
\ No newline at end of file
+            except Exception as e:
+                error = f"Ocorreu um erro: {str(e)}"
+                placeholder.markdown(error)
+                st.session_state.history.append(AIMessage(content=error))
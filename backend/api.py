@@ -1,9 +1,14 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import sqlite3
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from contextlib import asynccontextmanager
+import json
 from datetime import datetime
 import os
 
+from backend.db import connect, fetchall, fetchone, get_pool, run_db
+from backend.schema import migrate
+
 class EmployeeRequest(BaseModel):
     employeeCode: str
 
@@ -15,96 +20,121 @@ class PayrollResponse(BaseModel):
     name: str
     YTDPayroll: float
 
-app = FastAPI()
-
-def init_db():
-    if os.path.exists("employee.db"):
-        os.remove("employee.db")
-    conn = sqlite3.connect("employee.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS employee (
-            employee_code TEXT PRIMARY KEY,
-            name TEXT
-        )
-        """
-    )
+class EmployeeSummaryResponse(BaseModel):
+    name: str
+    vacancyBalanceDays: Optional[int]
+    YTDPayroll: Optional[float]
 
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS earnings (
-            payment_date TEXT,
-            employee_code TEXT,
-            amount REAL,
-            FOREIGN KEY (employee_code) REFERENCES employee (employee_code)
-        )
-        """
-    )
+MAX_BATCH_CODES = int(os.getenv("MAX_BATCH_CODES", "10000"))
 
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS employee_vacancy (
-            employee_code TEXT PRIMARY KEY,
-            balance_days INTEGER,
-            FOREIGN KEY (employee_code) REFERENCES employee (employee_code)
-        )
-        """
-    )
+class EmployeeBatchRequest(BaseModel):
+    employeeCodes: List[str] = Field(max_length=MAX_BATCH_CODES)
 
-    cursor.executemany(
-        """
-        INSERT OR IGNORE INTO employee (employee_code, name)
-        VALUES (?, ?)
-        """,
-        [
-            ("abc123", "Allan Ferreira"),
-            ("def456", "Yan Ferreira"),
-        ],
-    )
-
-    cursor.executemany(
-        """
-        INSERT OR IGNORE INTO employee_vacancy (employee_code, balance_days)
-        VALUES (?, ?)
-        """,
-        [
-            ("abc123", 10),
-            ("def456", 20),
-        ],
-    )
-
-    cursor.executemany(
-        """
-        INSERT OR IGNORE INTO earnings (payment_date, employee_code, amount)
-        VALUES (?, ?, ?)
-        """,
-        [
-            ("2025-01-01", "abc123", 50.00),
-            ("2025-01-02", "abc123", 50.00),
-            ("2025-01-01", "def456", 100.00),
-            ("2025-01-02", "def456", 100.00),
-        ],
-    )
+class VacancyBatchItem(BaseModel):
+    employeeCode: str
+    name: str
+    vacancyBalanceDays: Optional[int]
 
-    conn.commit()
-    conn.close()
+class PayrollBatchItem(BaseModel):
+    employeeCode: str
+    name: str
+    YTDPayroll: Optional[float]
+
+class VacancyBatchResponse(BaseModel):
+    results: List[VacancyBatchItem]
+    missing: List[str]
+
+class PayrollBatchResponse(BaseModel):
+    results: List[PayrollBatchItem]
+    missing: List[str]
+
+# YTD payroll of an employee: the per-year rollup kept by the earnings triggers,
+# minus any earnings already booked with a payment date from today onwards.
+# Reads one rollup row per year plus an index range scan of future-dated earnings,
+# instead of summing the employee's whole earnings history.
+YTD_PAYROLL_SQL = (
+    "((SELECT SUM(p.total) FROM payroll_ytd p WHERE p.employee_code = e.employee_code) " \
+    " - COALESCE((SELECT SUM(er.amount) FROM earnings er " \
+    "   WHERE er.employee_code = e.employee_code AND er.payment_date >= ?), 0))"
+)
+
+def seed_demo_data(conn):
+    """Insert the demo employees into an empty database; existing data is left alone."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM employee LIMIT 1").fetchone() is None:
+            cursor = conn.cursor()
+
+            cursor.executemany(
+                """
+                INSERT INTO employee (employee_code, name)
+                VALUES (?, ?)
+                """,
+                [
+                    ("abc123", "Allan Ferreira"),
+                    ("def456", "Yan Ferreira"),
+                ],
+            )
+
+            cursor.executemany(
+                """
+                INSERT INTO employee_vacancy (employee_code, balance_days)
+                VALUES (?, ?)
+                """,
+                [
+                    ("abc123", 10),
+                    ("def456", 20),
+                ],
+            )
+
+            cursor.executemany(
+                """
+                INSERT INTO earnings (payment_date, employee_code, amount)
+                VALUES (?, ?, ?)
+                """,
+                [
+                    ("2025-01-01", "abc123", 50.00),
+                    ("2025-01-02", "abc123", 50.00),
+                    ("2025-01-01", "def456", 100.00),
+                    ("2025-01-02", "def456", 100.00),
+                ],
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
 
-init_db()
+def init_db():
+    """
+    Bring the schema up to date at startup. Data is never deleted: migrations
+    only add what is missing, and the demo rows (SEED_DEMO_DATA) only go into an
+    empty database. Load real data with `python -m backend.loader`.
+    """
+    conn = connect()
+    try:
+        migrate(conn)
+        if os.getenv("SEED_DEMO_DATA", "true").lower() in ("1", "true", "yes"):
+            seed_demo_data(conn)
+    finally:
+        conn.close()
+
+@asynccontextmanager
+async def lifespan(app):
+    init_db()
+    yield
+    get_pool().close()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/employee/vacancy", response_model=VacancyResponse)
 async def get_employee_vacancy(request: EmployeeRequest):
-    conn = sqlite3.connect("employee.db")
-    cursor = conn.cursor()
-    cursor.execute(
+    result = await run_db(
+        fetchone,
         "SELECT e.name, ev.balance_days FROM employee e  " \
         " LEFT JOIN employee_vacancy ev ON e.employee_code = ev.employee_code " \
         " WHERE e.employee_code = ?",
         (request.employeeCode,)
     )
-    result = cursor.fetchone()
-    conn.close()
 
     if result:
         return VacancyResponse(
@@ -116,16 +146,12 @@ async def get_employee_vacancy(request: EmployeeRequest):
 
 @app.post("/employee/payroll", response_model=PayrollResponse)
 async def get_employee_payroll(request: EmployeeRequest):
-    conn = sqlite3.connect("employee.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT e.name, SUM(amount) AS ytd_payroll FROM employee e " \
-        " LEFT JOIN earnings er ON e.employee_code = er.employee_code " \
-        " WHERE e.employee_code = ? AND er.payment_date < ?",
-        (request.employeeCode, datetime.now().strftime("%Y-%m-%d"))
+    result = await run_db(
+        fetchone,
+        f"SELECT e.name, {YTD_PAYROLL_SQL} AS ytd_payroll FROM employee e " \
+        " WHERE e.employee_code = ?",
+        (datetime.now().strftime("%Y-%m-%d"), request.employeeCode)
     )
-    result = cursor.fetchone()
-    conn.close()
 
     if result:
         return PayrollResponse(
@@ -134,3 +160,73 @@ async def get_employee_payroll(request: EmployeeRequest):
         )
     else:
         raise HTTPException(status_code=404, detail="Employee not found")
+
+@app.post("/employee/summary", response_model=EmployeeSummaryResponse)
+async def get_employee_summary(request: EmployeeRequest):
+    """Name, vacation balance and YTD payroll of one employee in a single query."""
+    result = await run_db(
+        fetchone,
+        f"SELECT e.name, ev.balance_days, {YTD_PAYROLL_SQL} AS ytd_payroll " \
+        " FROM employee e " \
+        " LEFT JOIN employee_vacancy ev ON e.employee_code = ev.employee_code " \
+        " WHERE e.employee_code = ?",
+        (datetime.now().strftime("%Y-%m-%d"), request.employeeCode)
+    )
+
+    if result:
+        return EmployeeSummaryResponse(
+            name=result[0],
+            vacancyBalanceDays=result[1],
+            YTDPayroll=result[2]
+        )
+    else:
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+def unique_codes(codes):
+    """Requested codes without duplicates, in request order."""
+    return list(dict.fromkeys(codes))
+
+@app.post("/employee/vacancy/batch", response_model=VacancyBatchResponse)
+async def get_employee_vacancy_batch(request: EmployeeBatchRequest):
+    """
+    Vacation balances for many employees with one query. The codes are passed as
+    a single JSON parameter (json_each), so the batch size is not bound by
+    SQLite's parameter limit. Unknown codes are listed in `missing`.
+    """
+    codes = unique_codes(request.employeeCodes)
+    rows = await run_db(
+        fetchall,
+        "SELECT e.employee_code, e.name, ev.balance_days FROM employee e " \
+        " LEFT JOIN employee_vacancy ev ON e.employee_code = ev.employee_code " \
+        " WHERE e.employee_code IN (SELECT value FROM json_each(?))",
+        (json.dumps(codes),)
+    )
+    rows = {row[0]: row for row in rows}
+
+    return VacancyBatchResponse(
+        results=[
+            VacancyBatchItem(employeeCode=code, name=rows[code][1], vacancyBalanceDays=rows[code][2])
+            for code in codes if code in rows
+        ],
+        missing=[code for code in codes if code not in rows]
+    )
+
+@app.post("/employee/payroll/batch", response_model=PayrollBatchResponse)
+async def get_employee_payroll_batch(request: EmployeeBatchRequest):
+    """YTD payroll for many employees with one query over the rollup; unknown codes are listed in `missing`."""
+    codes = unique_codes(request.employeeCodes)
+    rows = await run_db(
+        fetchall,
+        f"SELECT e.employee_code, e.name, {YTD_PAYROLL_SQL} AS ytd_payroll FROM employee e " \
+        " WHERE e.employee_code IN (SELECT value FROM json_each(?))",
+        (datetime.now().strftime("%Y-%m-%d"), json.dumps(codes))
+    )
+    rows = {row[0]: row for row in rows}
+
+    return PayrollBatchResponse(
+        results=[
+            PayrollBatchItem(employeeCode=code, name=rows[code][1], YTDPayroll=rows[code][2])
+            for code in codes if code in rows
+        ],
+        missing=[code for code in codes if code not in rows]
+    )
@@ -0,0 +1,101 @@
+"""
+SQLite connection pool for the backend API.
+
+Each worker process keeps up to DB_POOL_SIZE connections open instead of
+connecting per request. Connections use WAL (readers do not block each other
+or the writer), a busy timeout instead of immediate "database is locked"
+errors, and a larger prepared-statement cache. Handlers run their queries
+through run_db so the blocking sqlite3 calls stay off the event loop.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from starlette.concurrency import run_in_threadpool
+
+DB_PATH = os.getenv("EMPLOYEE_DB_PATH", "employee.db")
+
+
+def connect(path=None):
+    """Open a connection configured for concurrent use by the API."""
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        check_same_thread=False,
+        cached_statements=int(os.getenv("DB_CACHED_STATEMENTS", "256")),
+        timeout=float(os.getenv("DB_BUSY_TIMEOUT", "5")),
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class ConnectionPool:
+    """Fixed-size pool of connections, opened on demand and reused LIFO."""
+
+    def __init__(self, path=None, size=None):
+        self.path = path or DB_PATH
+        self.size = size or int(os.getenv("DB_POOL_SIZE", "8"))
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return connect(self.path)
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The pool of the current worker process (a forked worker opens its own)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool()
+        return _pool
+
+
+def fetchone(sql, params=()):
+    with get_pool().connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def fetchall(sql, params=()):
+    with get_pool().connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+async def run_db(function, *args):
+    """Run a blocking database function in the threadpool and await its result."""
+    return await run_in_threadpool(function, *args)
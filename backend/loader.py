@@ -0,0 +1,243 @@
+"""
+Bulk loader for the employee database.
+
+Reads employees, vacation balances and earnings from CSV (with a header row)
+or JSON Lines files and writes them with executemany in chunks of
+LOADER_CHUNK_SIZE rows, one transaction per chunk. The connection is tuned
+for ingest (synchronous=OFF, a large page cache, temp structures in memory),
+so a crash of the machine mid-load can lose the last chunks; the API keeps
+serving from the same WAL database while a load runs.
+
+Columns:
+    employees   employee_code, name            (upserted)
+    vacancy     employee_code, balance_days    (upserted)
+    earnings    payment_date, employee_code, amount   (appended)
+
+Vacancy and earnings rows for an employee_code that is not in the employee
+table are rejected like malformed rows. Each earnings row is stored with the
+file it came from (by SHA-256 of its content, in load_source) and its record
+number, so loading the same file again, e.g. after a failed or partial run,
+only appends the records that are not in the database yet.
+
+Usage:
+    python -m backend.loader --employees employees.csv --vacancy vacancy.csv --earnings earnings.jsonl
+    python -m backend.loader --earnings history.csv --offline
+
+With --offline the earnings index and payroll_ytd triggers are dropped for
+the load and rebuilt at the end, which is much faster for large histories but
+leaves YTD answers stale until the load finishes.
+"""
+import os
+import csv
+import json
+import time
+import hashlib
+import logging
+import argparse
+from itertools import islice
+
+from backend.db import DB_PATH, connect
+from backend.schema import (
+    create_earnings_index,
+    create_payroll_rollup_triggers,
+    drop_payroll_rollup_triggers,
+    migrate,
+    rebuild_payroll_rollup,
+)
+
+logger = logging.getLogger(__name__)
+
+# table: (SQL, columns as (name, type), whether rows carry their (source_id, source_row))
+TABLES = {
+    "employees": (
+        "INSERT INTO employee (employee_code, name) VALUES (?, ?) "
+        "ON CONFLICT (employee_code) DO UPDATE SET name = excluded.name",
+        (("employee_code", str), ("name", str)),
+        False,
+    ),
+    "vacancy": (
+        "INSERT INTO employee_vacancy (employee_code, balance_days) VALUES (?, ?) "
+        "ON CONFLICT (employee_code) DO UPDATE SET balance_days = excluded.balance_days",
+        (("employee_code", str), ("balance_days", int)),
+        False,
+    ),
+    "earnings": (
+        # Ignored when (source_id, source_row) exists: the record was written by an earlier load of the file
+        "INSERT OR IGNORE INTO earnings (payment_date, employee_code, amount, source_id, source_row) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (("payment_date", str), ("employee_code", str), ("amount", float)),
+        True,
+    ),
+}
+
+# Load order: employees first, so vacancy and earnings rows satisfy their foreign keys
+LOAD_ORDER = ("employees", "vacancy", "earnings")
+
+
+def read_records(path):
+    """Yield (line number, dict) for each record of a CSV or JSON Lines file."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith((".jsonl", ".ndjson", ".json")):
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield number, json.loads(line)
+        else:
+            for number, record in enumerate(csv.DictReader(f), start=2):
+                yield number, record
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def register_source(conn, path):
+    """Id of the file in load_source, identified by content so a renamed copy is still recognised."""
+    sha256 = file_sha256(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("INSERT INTO load_source (sha256, path) VALUES (?, ?) ON CONFLICT (sha256) DO NOTHING", (sha256, path))
+        source_id = conn.execute("SELECT id FROM load_source WHERE sha256 = ?", (sha256,)).fetchone()[0]
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return source_id
+
+
+def to_rows(records, columns, path, stats, employees=None, source_id=None):
+    """
+    Convert records to parameter tuples, skipping (and counting) the malformed
+    ones and, when employees is given, those for an employee_code not in it.
+    With a source_id each tuple ends with (source_id, record number).
+    """
+    for number, record in records:
+        try:
+            if not record.get("employee_code"):
+                raise ValueError("missing employee_code")
+            if employees is not None and str(record["employee_code"]) not in employees:
+                raise ValueError(f"unknown employee_code {record['employee_code']!r}")
+            row = tuple(None if record.get(name) in (None, "") else kind(record[name]) for name, kind in columns)
+            yield row if source_id is None else row + (source_id, number)
+        except (TypeError, ValueError) as e:
+            stats["rejected"] += 1
+            if stats["rejected"] <= 10:
+                logger.warning(f"{path}:{number}: skipping row ({e})")
+
+
+def tune_for_ingest(conn):
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(f"PRAGMA cache_size=-{int(os.getenv('LOADER_CACHE_MB', '256')) * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+def load_file(conn, table, path, chunk_size=None):
+    """
+    Load one file into table ("employees", "vacancy" or "earnings").
+
+    Returns:
+        dict: rows loaded, rows rejected, rows already loaded by an earlier run and elapsed seconds
+    """
+    chunk_size = chunk_size or int(os.getenv("LOADER_CHUNK_SIZE", "50000"))
+    sql, columns, keyed = TABLES[table]
+    stats = {"rows": 0, "rejected": 0, "already_loaded": 0}
+    start = time.perf_counter()
+    source_id = register_source(conn, path) if keyed else None
+    # Check foreign keys up front, so one orphan row is rejected instead of aborting its chunk
+    employees = None
+    if table != "employees":
+        employees = {code for (code,) in conn.execute("SELECT employee_code FROM employee")}
+    rows = to_rows(read_records(path), columns, path, stats, employees, source_id)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            inserted = conn.executemany(sql, chunk).rowcount
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        stats["rows"] += inserted
+        stats["already_loaded"] += len(chunk) - inserted
+        logger.info(f"{table}: {stats['rows']} rows loaded from {path}")
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def load(files, db_path=None, chunk_size=None, offline=False):
+    """
+    Migrate the database and load the given files.
+
+    Args:
+        files (dict): {"employees"|"vacancy"|"earnings": path}
+        db_path (str): Database to load into (default EMPLOYEE_DB_PATH)
+        chunk_size (int): Rows per executemany/transaction (default LOADER_CHUNK_SIZE)
+        offline (bool): Drop the earnings index and rollup triggers during the earnings load and rebuild them afterwards
+
+    Returns:
+        dict: Per-table stats from load_file
+    """
+    conn = connect(db_path or DB_PATH)
+    try:
+        migrate(conn)
+        tune_for_ingest(conn)
+        results = {}
+        for table in LOAD_ORDER:
+            if not files.get(table):
+                continue
+            bypass = offline and table == "earnings"
+            if bypass:
+                conn.execute("BEGIN IMMEDIATE")
+                drop_payroll_rollup_triggers(conn.cursor())
+                conn.execute("DROP INDEX IF EXISTS idx_earnings_employee_date")
+                conn.commit()
+            try:
+                results[table] = load_file(conn, table, files[table], chunk_size)
+            finally:
+                if bypass:
+                    # Restore the index and triggers even after a failed load, so the API stays correct
+                    rebuild_start = time.perf_counter()
+                    conn.execute("BEGIN IMMEDIATE")
+                    cursor = conn.cursor()
+                    create_earnings_index(cursor)
+                    rebuild_payroll_rollup(cursor)
+                    create_payroll_rollup_triggers(cursor)
+                    conn.commit()
+                    logger.info(f"Rebuilt earnings index and payroll_ytd in {time.perf_counter() - rebuild_start:.1f}s")
+            if bypass:
+                results[table]["seconds"] += time.perf_counter() - rebuild_start
+        conn.execute("PRAGMA optimize")
+        return results
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", help="CSV/JSONL with employee_code, name")
+    parser.add_argument("--vacancy", help="CSV/JSONL with employee_code, balance_days")
+    parser.add_argument("--earnings", help="CSV/JSONL with payment_date, employee_code, amount")
+    parser.add_argument("--db", default=None, help="Database path (default EMPLOYEE_DB_PATH)")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--offline", action="store_true", help="Rebuild the earnings index and rollup after the load")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    files = {"employees": args.employees, "vacancy": args.vacancy, "earnings": args.earnings}
+    if not any(files.values()):
+        parser.error("nothing to load: pass --employees, --vacancy and/or --earnings")
+    for table, stats in load(files, args.db, args.chunk_size, args.offline).items():
+        rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+        print(f"{table}: {stats['rows']} rows, {stats['rejected']} rejected, {stats['already_loaded']} already loaded, "
+              f"{stats['seconds']:.1f}s ({rate:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Schema of the employee database, applied as numbered migrations.
+
+PRAGMA user_version records the last migration applied, so startup only runs
+the missing ones and never drops or recreates existing tables. Migrations run
+inside BEGIN IMMEDIATE: when several workers start at once, one applies them
+and the others wait on the lock, then find nothing left to do.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TRIGGERS = ("earnings_rollup_insert", "earnings_rollup_delete", "earnings_rollup_update")
+
+
+def create_base_tables(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS employee (
+            employee_code TEXT PRIMARY KEY,
+            name TEXT
+        )
+        """
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS earnings (
+            payment_date TEXT,
+            employee_code TEXT,
+            amount REAL,
+            FOREIGN KEY (employee_code) REFERENCES employee (employee_code)
+        )
+        """
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS employee_vacancy (
+            employee_code TEXT PRIMARY KEY,
+            balance_days INTEGER,
+            FOREIGN KEY (employee_code) REFERENCES employee (employee_code)
+        )
+        """
+    )
+
+
+def create_earnings_index(cursor):
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_earnings_employee_date
+        ON earnings (employee_code, payment_date)
+        """
+    )
+
+
+def create_payroll_rollup_triggers(cursor):
+    """Triggers that keep payroll_ytd in step with inserts, updates and deletes on earnings."""
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS earnings_rollup_insert AFTER INSERT ON earnings
+        BEGIN
+            INSERT INTO payroll_ytd (employee_code, year, total)
+            SELECT NEW.employee_code, substr(NEW.payment_date, 1, 4), COALESCE(NEW.amount, 0)
+            WHERE NEW.employee_code IS NOT NULL AND NEW.payment_date IS NOT NULL
+            ON CONFLICT (employee_code, year) DO UPDATE SET total = total + excluded.total;
+        END
+        """
+    )
+
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS earnings_rollup_delete AFTER DELETE ON earnings
+        BEGIN
+            UPDATE payroll_ytd SET total = total - COALESCE(OLD.amount, 0)
+            WHERE employee_code = OLD.employee_code AND year = substr(OLD.payment_date, 1, 4);
+        END
+        """
+    )
+
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS earnings_rollup_update
+        AFTER UPDATE OF payment_date, employee_code, amount ON earnings
+        BEGIN
+            UPDATE payroll_ytd SET total = total - COALESCE(OLD.amount, 0)
+            WHERE employee_code = OLD.employee_code AND year = substr(OLD.payment_date, 1, 4);
+            INSERT INTO payroll_ytd (employee_code, year, total)
+            SELECT NEW.employee_code, substr(NEW.payment_date, 1, 4), COALESCE(NEW.amount, 0)
+            WHERE NEW.employee_code IS NOT NULL AND NEW.payment_date IS NOT NULL
+            ON CONFLICT (employee_code, year) DO UPDATE SET total = total + excluded.total;
+        END
+        """
+    )
+
+
+def drop_payroll_rollup_triggers(cursor):
+    for name in ROLLUP_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_payroll_rollup(cursor):
+    """Recompute payroll_ytd from earnings, e.g. after loading rows with the triggers bypassed."""
+    cursor.execute("DELETE FROM payroll_ytd")
+    cursor.execute(
+        """
+        INSERT INTO payroll_ytd (employee_code, year, total)
+        SELECT employee_code, substr(payment_date, 1, 4), SUM(COALESCE(amount, 0))
+        FROM earnings
+        WHERE employee_code IS NOT NULL AND payment_date IS NOT NULL
+        GROUP BY employee_code, substr(payment_date, 1, 4)
+        """
+    )
+
+
+def add_payroll_rollup(cursor):
+    create_earnings_index(cursor)
+
+    # Earnings totals per employee and calendar year, maintained by the rollup triggers
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS payroll_ytd (
+            employee_code TEXT NOT NULL,
+            year TEXT NOT NULL,
+            total REAL NOT NULL,
+            PRIMARY KEY (employee_code, year)
+        ) WITHOUT ROWID
+        """
+    )
+
+    create_payroll_rollup_triggers(cursor)
+    rebuild_payroll_rollup(cursor)
+
+
+def add_earnings_load_source(cursor):
+    """
+    Record which loaded file and record each earnings row came from, so the
+    bulk loader can skip rows it already wrote when a file is loaded again.
+    Rows inserted by the API or before this migration keep NULLs and are not
+    constrained; nothing is rewritten or deleted.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS load_source (
+            id INTEGER PRIMARY KEY,
+            sha256 TEXT NOT NULL UNIQUE,
+            path TEXT,
+            first_loaded_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute("ALTER TABLE earnings ADD COLUMN source_id INTEGER REFERENCES load_source (id)")
+    cursor.execute("ALTER TABLE earnings ADD COLUMN source_row INTEGER")
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_earnings_source_row
+        ON earnings (source_id, source_row) WHERE source_id IS NOT NULL
+        """
+    )
+
+
+# Append only: the position of a migration in this list is its schema version
+MIGRATIONS = [
+    create_base_tables,
+    add_payroll_rollup,
+    add_earnings_load_source,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Apply the migrations newer than the database's user_version; returns the resulting version."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(f"Database schema version {version} is newer than this code ({SCHEMA_VERSION})")
+        cursor = conn.cursor()
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            logger.info(f"Applying database migration {number}: {migration.__name__}")
+            migration(cursor)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+        return SCHEMA_VERSION
+    except BaseException:
+        conn.rollback()
+        raise
@@ -0,0 +1,130 @@
+"""
+Compare FAISS index types (flat, IVF, HNSW, IVF-PQ) at several search
+settings: recall@k against exact search, query latency, memory and build time.
+
+By default a synthetic clustered corpus is used; pass --index-path to
+benchmark against the vectors of the published intranet index instead.
+
+Usage:
+    python -m benchmarks.bench_ann --vectors 50000 --dim 1536 --k 3
+    python -m benchmarks.bench_ann --index-path faiss_index
+"""
+import argparse
+import os
+import time
+
+import faiss
+import numpy as np
+
+from services.ann_index import FLAT, HNSW, IVF, IVFPQ, create_index, default_nlist, index_type_of
+
+
+def make_corpus(vectors, dim, queries, clusters, seed):
+    """Gaussian clusters with L2-normalised points, like OpenAI embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    assignments = rng.integers(0, clusters, size=vectors + queries)
+    data = centers[assignments] + 0.6 * rng.normal(size=(vectors + queries, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return np.ascontiguousarray(data[:vectors]), np.ascontiguousarray(data[vectors:])
+
+
+def load_published_vectors(index_path, queries, seed):
+    """Reconstruct the vectors of a published flat index; queries are perturbed corpus vectors."""
+    from services.index_store import resolve_index_dir
+    index = faiss.read_index(os.path.join(resolve_index_dir(index_path), "index.faiss"))
+    data = index.reconstruct_n(0, index.ntotal)
+    rng = np.random.default_rng(seed)
+    picked = data[rng.integers(0, len(data), size=queries)]
+    query_vectors = picked + 0.05 * rng.normal(size=picked.shape).astype(np.float32)
+    return np.ascontiguousarray(data), np.ascontiguousarray(query_vectors, dtype=np.float32)
+
+
+def recall_at_k(found, expected, k):
+    hits = sum(len(set(f[:k]) & set(e[:k])) for f, e in zip(found, expected))
+    return hits / (len(expected) * k)
+
+
+def time_queries(index, queries, k):
+    """Per-query latencies (ms), searching one query at a time as the app does."""
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, rows = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(rows[0])
+    return np.array(found), np.array(latencies)
+
+
+def memory_mb(index):
+    return len(faiss.serialize_index(index)) / (1024 * 1024)
+
+
+def settings(args):
+    """(index type, label, function applying the search parameter) for every configuration."""
+    yield FLAT, "exact", None
+    for nprobe in args.nprobe:
+        yield IVF, f"nprobe={nprobe}", lambda index, v=nprobe: setattr(index, "nprobe", v)
+    for ef in args.ef_search:
+        yield HNSW, f"efSearch={ef}", lambda index, v=ef: setattr(index.hnsw, "efSearch", v)
+    for nprobe in args.nprobe:
+        yield IVFPQ, f"nprobe={nprobe}", lambda index, v=nprobe: setattr(index, "nprobe", v)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--types", nargs="+", default=[FLAT, IVF, HNSW, IVFPQ])
+    parser.add_argument("--index-path", help="Benchmark the vectors of a published index")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.index_path:
+        data, queries = load_published_vectors(args.index_path, args.queries, args.seed)
+    else:
+        data, queries = make_corpus(args.vectors, args.dim, args.queries, args.clusters, args.seed)
+    dim = data.shape[1]
+    print(f"{len(data)} vectors, dim {dim}, {len(queries)} queries, k={args.k}, nlist={default_nlist(len(data))}")
+
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(data)
+    _, expected = exact.search(queries, args.k)
+
+    built = {}
+    fallbacks = set()
+    print(f"{'index':<8}{'setting':<14}{'recall@k':>10}{'p50 ms':>10}{'p99 ms':>10}{'memory MB':>12}{'build s':>10}")
+    for index_type, label, apply in settings(args):
+        if index_type not in args.types:
+            continue
+        if index_type not in built:
+            start = time.perf_counter()
+            index = create_index(dim, index_type, training_vectors=data)
+            index.add(data)
+            built[index_type] = (index, time.perf_counter() - start)
+        index, build_seconds = built[index_type]
+        actual_type = index_type_of(index)
+        if actual_type != index_type:
+            # create_index fell back (too few vectors to train): the search parameter does not apply
+            if index_type in fallbacks:
+                continue
+            fallbacks.add(index_type)
+            label = f"-> {actual_type}"
+        elif apply:
+            apply(faiss.downcast_index(index))
+        found, latencies = time_queries(index, queries, args.k)
+        print(
+            f"{index_type:<8}{label:<14}{recall_at_k(found, expected, args.k):>10.3f}"
+            f"{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 99):>10.3f}"
+            f"{memory_mb(index):>12.1f}{build_seconds:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
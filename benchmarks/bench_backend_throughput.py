@@ -0,0 +1,143 @@
+"""
+Compare the backend's payroll endpoint with a connection per request on the
+event loop (the previous handlers) against the pooled connections run in the
+threadpool, under concurrent load.
+
+A synthetic database is created in a temporary directory; requests go through
+httpx's in-process ASGI transport, so no server needs to be running. Besides
+requests/sec and latency, the benchmark reports the longest event-loop stall
+seen by a 10ms ticker: a blocking handler freezes every other coroutine of the
+worker (other requests, health checks, streaming responses) for its whole query.
+With the in-process transport a blocking handler runs to completion once
+started, so its latency percentiles leave out the time spent queued behind others.
+
+Usage:
+    python -m benchmarks.bench_backend_throughput --employees 2000 --earnings 300000 --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def make_database(path, employees, earnings, seed):
+    from backend.schema import migrate
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    codes = [f"emp{i:06d}" for i in range(employees)]
+    conn.executemany("INSERT INTO employee VALUES (?, ?)", [(code, f"Employee {code}") for code in codes])
+    conn.executemany("INSERT INTO employee_vacancy VALUES (?, ?)", [(code, rng.randint(0, 30)) for code in codes])
+    start = date(2024, 1, 1)
+    conn.executemany(
+        "INSERT INTO earnings (payment_date, employee_code, amount) VALUES (?, ?, ?)",
+        (
+            ((start + timedelta(days=rng.randint(0, 600))).isoformat(), rng.choice(codes), round(rng.uniform(50, 500), 2))
+            for _ in range(earnings)
+        ),
+    )
+    conn.commit()
+    conn.close()
+    return codes
+
+
+def legacy_app(db_path):
+    """The previous handler: a new connection and a blocking query inside `async def`."""
+    from fastapi import FastAPI, HTTPException
+    from backend.api import EmployeeRequest, PayrollResponse
+
+    app = FastAPI()
+
+    @app.post("/employee/payroll", response_model=PayrollResponse)
+    async def get_employee_payroll(request: EmployeeRequest):
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT e.name, SUM(amount) AS ytd_payroll FROM employee e "
+            " LEFT JOIN earnings er ON e.employee_code = er.employee_code "
+            " WHERE e.employee_code = ? AND er.payment_date < ?",
+            (request.employeeCode, date.today().isoformat()),
+        )
+        result = cursor.fetchone()
+        conn.close()
+        if result:
+            return PayrollResponse(name=result[0], YTDPayroll=result[1])
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+    return app
+
+
+async def run_load(app, codes, requests, concurrency, seed):
+    import httpx
+
+    rng = random.Random(seed)
+    payloads = [{"employeeCode": rng.choice(codes)} for _ in range(requests)]
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal stall
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stall = max(stall, time.perf_counter() - start - 0.01)
+
+    ticking = asyncio.create_task(ticker())
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(payload):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/employee/payroll", json=payload)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(payload) for payload in payloads))
+        elapsed = time.perf_counter() - start
+    done.set()
+    await ticking
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000,
+        "stall_ms": stall * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--earnings", type=int, default=300000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, "employee.db")
+    # Must be set before backend.db is imported, which reads it into DB_PATH
+    os.environ["EMPLOYEE_DB_PATH"] = db_path
+    import backend.api as api
+
+    codes = make_database(db_path, args.employees, args.earnings, args.seed)
+    print(f"{args.employees} employees, {args.earnings} earnings rows, {args.requests} requests, concurrency {args.concurrency}")
+
+    for label, app in (("connection per request", legacy_app(db_path)), ("pooled + threadpool", api.app)):
+        result = asyncio.run(run_load(app, codes, args.requests, args.concurrency, args.seed))
+        print(f"{label:<24} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  "
+              f"max loop stall {result['stall_ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Rows/sec of the bulk loader (backend/loader.py) on a synthetic payroll.
+
+Writes employees, vacation balances and an earnings history to CSV (or JSONL)
+in a temporary directory, then loads them into fresh databases:
+
+    row by row        one INSERT and commit per row, on a sample of the earnings
+    chunked online    chunked executemany with the rollup triggers active
+    chunked offline   same, with the index and triggers rebuilt after the load (--offline)
+
+Usage:
+    python -m benchmarks.bench_bulk_load --employees 50000 --earnings 3000000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from backend.loader import load, read_records
+
+
+def write_files(directory, employees, earnings, file_format, seed):
+    rng = random.Random(seed)
+    codes = [f"emp{i:07d}" for i in range(employees)]
+    start = date(2015, 1, 1)
+    tables = {
+        "employees": (("employee_code", "name"), ((code, f"Employee {code}") for code in codes)),
+        "vacancy": (("employee_code", "balance_days"), ((code, rng.randint(0, 30)) for code in codes)),
+        "earnings": (
+            ("payment_date", "employee_code", "amount"),
+            (
+                ((start + timedelta(days=rng.randint(0, 4000))).isoformat(), rng.choice(codes), round(rng.uniform(50, 5000), 2))
+                for _ in range(earnings)
+            ),
+        ),
+    }
+    files = {}
+    for table, (header, rows) in tables.items():
+        path = os.path.join(directory, f"{table}.{file_format}")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if file_format == "csv":
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(header, row))) + "\n")
+        files[table] = path
+    return files
+
+
+def row_by_row(db_path, files, sample):
+    """The naive loader: one INSERT and one commit per earnings row, default connection settings."""
+    load({"employees": files["employees"]}, db_path)
+    conn = sqlite3.connect(db_path)
+    start = time.perf_counter()
+    count = 0
+    for _, record in read_records(files["earnings"]):
+        if count == sample:
+            break
+        conn.execute(
+            "INSERT INTO earnings (payment_date, employee_code, amount) VALUES (?, ?, ?)",
+            (record["payment_date"], record["employee_code"], float(record["amount"])),
+        )
+        conn.commit()
+        count += 1
+    conn.close()
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=50000)
+    parser.add_argument("--earnings", type=int, default=3000000)
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--row-by-row-sample", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    start = time.perf_counter()
+    files = write_files(directory, args.employees, args.earnings, args.format, args.seed)
+    print(f"Wrote {args.employees} employees and {args.earnings} earnings rows as {args.format} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    rows, seconds = row_by_row(os.path.join(directory, "row_by_row.db"), files, args.row_by_row_sample)
+    print(f"{'row by row':<16} {'earnings':<9}{rows / seconds:>12,.0f} rows/s  ({rows} row sample in {seconds:.1f}s)")
+
+    for label, offline in (("chunked online", False), ("chunked offline", True)):
+        results = load(files, os.path.join(directory, f"{label.replace(' ', '_')}.db"), args.chunk_size, offline)
+        for table, stats in results.items():
+            print(f"{label:<16} {table:<9}{stats['rows'] / stats['seconds']:>12,.0f} rows/s  "
+                  f"({stats['rows']} rows in {stats['seconds']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
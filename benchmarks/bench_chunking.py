@@ -0,0 +1,98 @@
+"""
+Compare the threaded chunking path with the process-pool chunking mode on a
+synthetic corpus.
+
+Usage:
+    python -m benchmarks.bench_chunking --files 2000 --file-kb 40 --workers 8
+"""
+import argparse
+import concurrent.futures
+import os
+import random
+import time
+
+from services.chunking import records_to_documents, split_text_records
+
+WORDS = (
+    "policy employee benefits vacation payroll intranet department manager "
+    "request approval form deadline training security travel expense remote "
+    "office schedule holiday compliance health insurance onboarding"
+).split()
+
+
+def make_corpus(files, file_kb, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(files):
+        words = []
+        size = 0
+        while size < file_kb * 1024:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+            words.append(sentence)
+            size += len(sentence) + 1
+            if rng.random() < 0.1:
+                words.append("\n\n")
+        corpus.append((f"docs/file_{i:05d}.txt", " ".join(words)))
+    return corpus
+
+
+def run_threaded(corpus, chunk_size, chunk_overlap, workers):
+    """Current path: splitter calls on a thread pool, producing Document objects."""
+    documents = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(split_text_records, source, text, chunk_size, chunk_overlap)
+            for source, text in corpus
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            documents.extend(records_to_documents(*future.result()))
+    return documents
+
+
+def run_process(corpus, chunk_size, chunk_overlap, workers):
+    """Process-pool mode: compact (source, [texts]) records rebuilt in the parent."""
+    documents = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(split_text_records, source, text, chunk_size, chunk_overlap)
+            for source, text in corpus
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            documents.extend(records_to_documents(*future.result()))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--file-kb", type=int, default=40)
+    parser.add_argument("--chunk-size", type=int, default=300)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--thread-workers", type=int, default=4, help="Threads in the current path (MAX_WORKERS)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes in process mode")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.files, args.file_kb, args.seed)
+    total_mb = sum(len(text) for _, text in corpus) / (1024 * 1024)
+    print(f"Corpus: {len(corpus)} files, {total_mb:.1f} MB")
+
+    results = {}
+    for name, runner, workers in (
+        ("thread", run_threaded, args.thread_workers),
+        ("process", run_process, args.workers),
+    ):
+        start = time.perf_counter()
+        documents = runner(corpus, args.chunk_size, args.chunk_overlap, workers)
+        elapsed = time.perf_counter() - start
+        results[name] = (elapsed, len(documents))
+        print(f"{name:>8}: {elapsed:8.2f}s  {len(documents):9d} chunks  "
+              f"{len(documents) / elapsed:10.0f} chunks/s  ({workers} workers)")
+
+    if results["thread"][1] != results["process"][1]:
+        print("WARNING: chunk counts differ between modes")
+    print(f"Speedup: {results['thread'][0] / results['process'][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+YTD payroll lookup cost as the earnings history grows: the previous full-table
+SUM (earnings had no index), the same SUM over the (employee_code, payment_date)
+index, and the payroll_ytd rollup used by the backend now.
+
+Usage:
+    python -m benchmarks.bench_payroll_ytd --rows 100000 1000000 3000000 --employees 5000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from backend.api import YTD_PAYROLL_SQL
+from backend.schema import migrate
+
+SCAN_SQL = (
+    "SELECT e.name, SUM(amount) FROM employee e "
+    " LEFT JOIN earnings er NOT INDEXED ON e.employee_code = er.employee_code "
+    " WHERE e.employee_code = ? AND er.payment_date < ?"
+)
+INDEXED_SQL = (
+    "SELECT e.name, SUM(amount) FROM employee e "
+    " LEFT JOIN earnings er ON e.employee_code = er.employee_code "
+    " WHERE e.employee_code = ? AND er.payment_date < ?"
+)
+ROLLUP_SQL = f"SELECT e.name, {YTD_PAYROLL_SQL} FROM employee e WHERE e.employee_code = ?"
+
+
+def make_database(path, rows, employees, seed):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE employee (employee_code TEXT PRIMARY KEY, name TEXT)")
+    conn.execute("CREATE TABLE earnings (payment_date TEXT, employee_code TEXT, amount REAL)")
+    codes = [f"emp{i:06d}" for i in range(employees)]
+    conn.executemany("INSERT INTO employee VALUES (?, ?)", [(code, f"Employee {code}") for code in codes])
+    start = date(2015, 1, 1)
+    conn.executemany(
+        "INSERT INTO earnings VALUES (?, ?, ?)",
+        (
+            ((start + timedelta(days=rng.randint(0, 4000))).isoformat(), rng.choice(codes), round(rng.uniform(50, 500), 2))
+            for _ in range(rows)
+        ),
+    )
+    conn.commit()
+    # Index, rollup table and triggers are created after the load; the migration fills the rollup once
+    migrate(conn)
+    return conn, codes
+
+
+def time_lookups(conn, sql, params_for, codes, lookups, seed):
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(lookups):
+        code = rng.choice(codes)
+        start = time.perf_counter()
+        conn.execute(sql, params_for(code)).fetchone()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[int(0.99 * (len(latencies) - 1))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    today = date.today().isoformat()
+    queries = (
+        ("full scan (before)", SCAN_SQL, lambda code: (code, today)),
+        ("indexed SUM", INDEXED_SQL, lambda code: (code, today)),
+        ("payroll_ytd rollup", ROLLUP_SQL, lambda code: (today, code)),
+    )
+
+    for rows in args.rows:
+        directory = tempfile.mkdtemp()
+        conn, codes = make_database(os.path.join(directory, "employee.db"), rows, args.employees, args.seed)
+        print(f"{rows} earnings rows, {args.employees} employees")
+        for label, sql, params_for in queries:
+            # Fewer lookups for the full scan, which reads the whole table each time
+            lookups = max(5, args.lookups // 20) if sql is SCAN_SQL else args.lookups
+            p50, p99 = time_lookups(conn, sql, params_for, codes, lookups, args.seed)
+            print(f"  {label:<20} p50 {p50:>9.3f} ms  p99 {p99:>9.3f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
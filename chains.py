@@ -4,17 +4,30 @@ import datetime
 from langchain_core.prompts import ChatPromptTemplate,MessagesPlaceholder
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 import requests
+import httpx
 from classes import ClassifyQuestion, FinalResponse, GlobalResponse, SalaryResponse, VacancyResponse
 from langchain_core.messages import ToolMessage
 import json
+import uuid
 from langchain_community.vectorstores import FAISS
 from langchain.document_loaders import TextLoader
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.runnables import RunnableLambda
 
 from services.Intranet_repository import IntranetRepository
+from services.intent_rules import classify_text, SALARY_REQUEST, VACANCY_REQUEST
+from services.intent_classifier import EmbeddingIntentClassifier
+from services.semantic_cache import SemanticAnswerCache
+from services.retrieval import aretrieve_documents, lexical_fast_path, retrieve_documents
+from services.query_embedding_cache import embedding_model_name, get_query_embedding_cache
+from services.hr_client import get_hr_client
+import logging
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 llm = ChatOpenAI(model="gpt-4-turbo-preview")
+query_embeddings = OpenAIEmbeddings()
 
 intranet_repository = IntranetRepository()
 vectorstore = intranet_repository.create_or_load_faiss_index()
@@ -53,6 +66,160 @@ first_responder = actor_prompt_template | llm.bind_tools(
     tools=[ClassifyQuestion], tool_choice="ClassifyQuestion"
 )
 
+### Tool calls ###
+def build_tool_call_message(tool_name, arguments):
+    """
+    Build an AIMessage carrying a single OpenAI-style tool call, the same shape
+    the model returns from llm.bind_tools, without calling the model.
+
+    Args:
+        tool_name (str): Name of the tool (e.g. 'SalaryResponse')
+        arguments (str): JSON-encoded tool arguments
+
+    Returns:
+        AIMessage: Message that final_responder and decision_flow can consume
+    """
+    tool_call_id = f"call_{uuid.uuid4().hex}"
+    return AIMessage(
+        content="",
+        additional_kwargs={
+            'tool_calls': [{
+                'id': tool_call_id,
+                'type': 'function',
+                'function': {'name': tool_name, 'arguments': arguments},
+            }]
+        },
+        tool_calls=[{'name': tool_name, 'args': json.loads(arguments), 'id': tool_call_id}],
+    )
+
+### Tiered classifier ###
+CLASSIFIER_RULES_THRESHOLD = float(os.getenv("CLASSIFIER_RULES_THRESHOLD", "0.8"))
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "models/intent_classifier.npz")
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.9"))
+CLASSIFICATION_LOG_PATH = os.getenv("CLASSIFICATION_LOG_PATH")
+
+intent_classifier = None
+if INTENT_MODEL_PATH and os.path.isfile(INTENT_MODEL_PATH):
+    try:
+        intent_classifier = EmbeddingIntentClassifier.load(INTENT_MODEL_PATH, embedding_model_name(query_embeddings))
+        logger.info(f"Loaded intent classifier from {INTENT_MODEL_PATH}")
+    except Exception as e:
+        logger.error(f"Error loading intent classifier: {e}")
+
+
+def tag_classifier_tier(message, tier, confidence=None):
+    message.response_metadata['classifier_tier'] = tier
+    if confidence is not None:
+        message.response_metadata['classifier_confidence'] = confidence
+    return message
+
+def log_classification(question, message):
+    """Append the classifier decision to CLASSIFICATION_LOG_PATH (JSON lines), if configured."""
+    if not CLASSIFICATION_LOG_PATH:
+        return
+    try:
+        tool_calls = message.additional_kwargs.get('tool_calls') or []
+        if not tool_calls:
+            return
+        result = json.loads(tool_calls[-1]['function']['arguments'])
+        record = {
+            'time': datetime.datetime.now().isoformat(),
+            'question': question,
+            'request_type': result.get('request_type'),
+            'employee_code': result.get('employee_code'),
+            'tier': message.response_metadata.get('classifier_tier'),
+            'confidence': message.response_metadata.get('classifier_confidence'),
+        }
+        os.makedirs(os.path.dirname(CLASSIFICATION_LOG_PATH) or ".", exist_ok=True)
+        with open(CLASSIFICATION_LOG_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+    except Exception as e:
+        logger.error(f"Error logging classification: {e}")
+
+def classification_message(request_type, employee_code, tier, confidence):
+    classification = ClassifyQuestion(request_type=request_type, employee_code=employee_code)
+    message = build_tool_call_message("ClassifyQuestion", classification.json())
+    return tag_classifier_tier(message, tier, confidence)
+
+def embedding_tier_message(decision, embedding):
+    """Classification from the embedding classifier, or None when it is not confident enough."""
+    request_type, confidence = intent_classifier.predict(embedding)
+    # HR lookups still need a code, which only the rules (or the LLM) can extract.
+    needs_code = request_type in (SALARY_REQUEST, VACANCY_REQUEST)
+    if confidence >= INTENT_CLASSIFIER_THRESHOLD and (decision.employee_code or not needs_code):
+        employee_code = decision.employee_code if needs_code else None
+        return classification_message(request_type, employee_code, "embedding", confidence)
+    return None
+
+def classify_with_tiers(input_messages):
+    human_messages = [m.content for m in input_messages if isinstance(m, HumanMessage)]
+    if not human_messages:
+        return tag_classifier_tier(first_responder.invoke(input_messages), "llm")
+
+    question = human_messages[-1]
+    decision = classify_text(question, history=reversed(human_messages[:-1]))
+    if decision.request_type and decision.confidence >= CLASSIFIER_RULES_THRESHOLD:
+        return classification_message(decision.request_type, decision.employee_code, "rules", decision.confidence)
+
+    # Follow-ups of an HR lookup need the history, which only the LLM classifier reads
+    if intent_classifier is not None and not decision.after_hr_turn:
+        try:
+            message = embedding_tier_message(
+                decision, get_query_embedding_cache().embed_query(question, query_embeddings)
+            )
+            if message is not None:
+                return message
+        except Exception as e:
+            logger.error(f"Embedding classifier failed, falling back to LLM: {e}")
+
+    return tag_classifier_tier(first_responder.invoke(input_messages), "llm")
+
+async def aclassify_with_tiers(input_messages):
+    human_messages = [m.content for m in input_messages if isinstance(m, HumanMessage)]
+    if not human_messages:
+        return tag_classifier_tier(await first_responder.ainvoke(input_messages), "llm")
+
+    question = human_messages[-1]
+    decision = classify_text(question, history=reversed(human_messages[:-1]))
+    if decision.request_type and decision.confidence >= CLASSIFIER_RULES_THRESHOLD:
+        return classification_message(decision.request_type, decision.employee_code, "rules", decision.confidence)
+
+    # Follow-ups of an HR lookup need the history, which only the LLM classifier reads
+    if intent_classifier is not None and not decision.after_hr_turn:
+        try:
+            message = embedding_tier_message(
+                decision, await get_query_embedding_cache().aembed_query(question, query_embeddings)
+            )
+            if message is not None:
+                return message
+        except Exception as e:
+            logger.error(f"Embedding classifier failed, falling back to LLM: {e}")
+
+    return tag_classifier_tier(await first_responder.ainvoke(input_messages), "llm")
+
+def report_classification(input_messages, message):
+    logger.info(
+        f"Classifier tier={message.response_metadata.get('classifier_tier')} "
+        f"confidence={message.response_metadata.get('classifier_confidence')}"
+    )
+    human_messages = [m.content for m in input_messages if isinstance(m, HumanMessage)]
+    if human_messages:
+        log_classification(human_messages[-1], message)
+    return message
+
+def classifier_responder(input_messages):
+    """
+    Classify the last user message with local rules first, then with the
+    embedding classifier (when INTENT_MODEL_PATH exists), and only call the
+    LLM classifier (first_responder) when neither is confident.
+    The deciding tier is reported in response_metadata['classifier_tier'].
+    """
+    return report_classification(input_messages, classify_with_tiers(input_messages))
+
+async def aclassifier_responder(input_messages):
+    """Async variant of classifier_responder."""
+    return report_classification(input_messages, await aclassify_with_tiers(input_messages))
+
 ### Final ###
 def final_responder(input_messages):
     last_message = input_messages[-1]
@@ -79,9 +246,13 @@ def final_responder(input_messages):
         )
     raise ValueError("No valid message found.")
 
+async def afinal_responder(input_messages):
+    # Pure formatting, nothing to await
+    return final_responder(input_messages)
+
 
 ### Global ###
-def query_document(question, vectorstore, k=3):
+def query_document(question, vectorstore, k=3, source=None, prefix=None):
     """
     Query the document repository with a question and return relevant contexts.
     Includes source information in the results.
@@ -90,11 +261,13 @@ def query_document(question, vectorstore, k=3):
         question (str): The query string
         vectorstore: The FAISS vectorstore
         k (int): Number of results to return
+        source (str): Restrict the search to this document
+        prefix (str): Restrict the search to documents under this key prefix
         
     Returns:
         str: Concatenated context from relevant documents
     """
-    docs = vectorstore.similarity_search(question, k=k)
+    docs = retrieve_documents(question, vectorstore, k=k, source=source, prefix=prefix)
     if docs:
         # Format the results to include source information
         results = []
@@ -106,6 +279,13 @@ def query_document(question, vectorstore, k=3):
         return "\n\n".join(results)
     return "No relevant information found."
 
+async def aquery_document(question, vectorstore, k=3, source=None, prefix=None):
+    """Async variant of query_document."""
+    docs = await aretrieve_documents(question, vectorstore, k=k, source=source, prefix=prefix)
+    if docs:
+        return "\n\n".join(f"[Source: {doc.metadata.get('source', 'Unknown')}]\n{doc.page_content}" for doc in docs)
+    return "No relevant information found."
+
 def build_prompt_with_context(question, context):
     prompt = f"""
     You are an expert assistant. Use the context below to answer the
@@ -121,29 +301,168 @@ def build_prompt_with_context(question, context):
     """
     return prompt
 
-def global_responder_logic(input_message):
-    last_human_message = None
+def get_last_human_message(input_message):
     for message in reversed(input_message):
-        if isinstance(message, HumanMessage): 
-            last_human_message = message.content
-            break
+        if isinstance(message, HumanMessage):
+            return message.content
+    raise ValueError("No human message found in the input messages.")
 
-    if not last_human_message:
-        raise ValueError("No human message found in the input messages.")
+def global_responder_logic(input_message):
+    last_human_message = get_last_human_message(input_message)
 
     # Construir contexto e criar resposta
-    context = query_document(last_human_message, vectorstore)
+    context = query_document(last_human_message, intranet_repository.get_vectorstore())
     prompt = build_prompt_with_context(last_human_message, context)
     response = llm.predict(prompt)
     global_response = GlobalResponse(answer=response)
     return global_response.json()
 
-global_responder = global_responder_logic | llm.bind_tools(
-    tools=[GlobalResponse], tool_choice="GlobalResponse"
-)
+async def aglobal_responder_logic(input_message):
+    last_human_message = get_last_human_message(input_message)
+    context = await aquery_document(last_human_message, intranet_repository.get_vectorstore())
+    prompt = build_prompt_with_context(last_human_message, context)
+    response = await llm.ainvoke(prompt)
+    return GlobalResponse(answer=response.content).json()
 
-### salary ###
-def salary_responder_logic(input_message):
+def global_prompt_logic(input_message):
+    """
+    Build the RAG prompt for the last human message so that the model can
+    answer it directly through the GlobalResponse tool in a single completion.
+    """
+    last_human_message = get_last_human_message(input_message)
+    context = query_document(last_human_message, intranet_repository.get_vectorstore())
+    return build_prompt_with_context(last_human_message, context)
+
+async def aglobal_prompt_logic(input_message):
+    last_human_message = get_last_human_message(input_message)
+    context = await aquery_document(last_human_message, intranet_repository.get_vectorstore())
+    return build_prompt_with_context(last_human_message, context)
+
+def validate_global_response(message):
+    """
+    Validate the GlobalResponse tool call produced by the model and pass the
+    message through unchanged, since it already has the shape final_responder expects.
+    """
+    tool_calls = message.additional_kwargs.get('tool_calls') if hasattr(message, 'additional_kwargs') else None
+    if not tool_calls:
+        raise ValueError("GlobalResponse tool call not found in the model output.")
+    last_tool = tool_calls[-1]
+    if last_tool['function']['name'] != 'GlobalResponse':
+        raise ValueError(f"Unexpected tool: {last_tool['function']['name']}")
+    GlobalResponse.model_validate_json(last_tool['function']['arguments'])
+    return message
+
+global_response_llm = llm.bind_tools(tools=[GlobalResponse], tool_choice="GlobalResponse")
+
+# Two completions: free-text answer, then a second call to wrap it in GlobalResponse.
+global_responder_two_pass = global_responder_logic | global_response_llm
+
+# One completion: the model answers the RAG prompt straight into GlobalResponse.
+global_responder_single_pass = global_prompt_logic | global_response_llm | validate_global_response
+
+async def aglobal_responder_two_pass(input_message, config=None):
+    return await global_response_llm.ainvoke(await aglobal_responder_logic(input_message), config)
+
+async def aglobal_responder_single_pass(input_message, config=None):
+    return validate_global_response(await global_response_llm.ainvoke(await aglobal_prompt_logic(input_message), config))
+
+def stream_global_response(input_message, config=None):
+    """
+    One plain-text completion over the RAG prompt, wrapped into GlobalResponse
+    without a second model call. The answer is generated as message content
+    rather than tool-call arguments, so graph.stream(stream_mode="messages")
+    forwards its tokens to the chat UI as they arrive.
+    """
+    response = llm.invoke(global_prompt_logic(input_message), config)
+    return build_tool_call_message("GlobalResponse", GlobalResponse(answer=response.content).json())
+
+async def aglobal_responder_streaming(input_message, config=None):
+    response = await llm.ainvoke(await aglobal_prompt_logic(input_message), config)
+    return build_tool_call_message("GlobalResponse", GlobalResponse(answer=response.content).json())
+
+global_responder_streaming = RunnableLambda(stream_global_response)
+
+GLOBAL_RESPONDER_STREAMING = os.getenv("GLOBAL_RESPONDER_STREAMING", "true").lower() == "true"
+GLOBAL_RESPONDER_SINGLE_PASS = os.getenv("GLOBAL_RESPONDER_SINGLE_PASS", "true").lower() == "true"
+
+### Semantic cache ###
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+
+semantic_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000")),
+) if SEMANTIC_CACHE_ENABLED else None
+
+def skips_semantic_cache(question):
+    """
+    Keyword lookups that the lexical fast path answers without embedding skip
+    the semantic cache, unless their embedding is already cached: embedding
+    them only for the cache lookup would cost the call the fast path saves.
+    """
+    if get_query_embedding_cache().peek(question, query_embeddings) is not None:
+        return False
+    return lexical_fast_path(question, intranet_repository.get_vectorstore()) is not None
+
+def with_semantic_cache(responder):
+    """
+    Wrap a global responder so that questions similar to a previously answered
+    one, on the same index version, are answered from the cache without
+    retrieval or generation.
+    """
+    def cached_responder(input_message, config=None):
+        question = get_last_human_message(input_message)
+        if skips_semantic_cache(question):
+            return responder.invoke(input_message, config)
+        index_version = intranet_repository.get_index_version()
+        embedding = get_query_embedding_cache().embed_query(question, query_embeddings)
+
+        answer = semantic_cache.lookup(embedding, index_version)
+        if answer is not None:
+            logger.info("Semantic cache hit for global question")
+            return build_tool_call_message("GlobalResponse", GlobalResponse(answer=answer).json())
+
+        message = responder.invoke(input_message, config)
+        arguments = message.additional_kwargs['tool_calls'][-1]['function']['arguments']
+        semantic_cache.store(embedding, GlobalResponse.model_validate_json(arguments).answer, index_version)
+        return message
+    return cached_responder
+
+def with_async_semantic_cache(responder):
+    """Async variant of with_semantic_cache, wrapping an async responder function."""
+    async def cached_responder(input_message, config=None):
+        question = get_last_human_message(input_message)
+        if skips_semantic_cache(question):
+            return await responder(input_message, config)
+        index_version = intranet_repository.get_index_version()
+        embedding = await get_query_embedding_cache().aembed_query(question, query_embeddings)
+
+        answer = semantic_cache.lookup(embedding, index_version)
+        if answer is not None:
+            logger.info("Semantic cache hit for global question")
+            return build_tool_call_message("GlobalResponse", GlobalResponse(answer=answer).json())
+
+        message = await responder(input_message, config)
+        arguments = message.additional_kwargs['tool_calls'][-1]['function']['arguments']
+        semantic_cache.store(embedding, GlobalResponse.model_validate_json(arguments).answer, index_version)
+        return message
+    return cached_responder
+
+if GLOBAL_RESPONDER_STREAMING:
+    global_responder = global_responder_streaming
+    aglobal_responder = aglobal_responder_streaming
+elif GLOBAL_RESPONDER_SINGLE_PASS:
+    global_responder = global_responder_single_pass
+    aglobal_responder = aglobal_responder_single_pass
+else:
+    global_responder = global_responder_two_pass
+    aglobal_responder = aglobal_responder_two_pass
+if semantic_cache is not None:
+    global_responder = with_semantic_cache(global_responder)
+    aglobal_responder = with_async_semantic_cache(aglobal_responder)
+
+### HR backend ###
+def employee_code_from_classification(input_message):
     if hasattr(input_message[-1], 'additional_kwargs') and \
         'tool_calls' in input_message[-1].additional_kwargs:
         tool_calls = input_message[-1].additional_kwargs['tool_calls']
@@ -153,65 +472,115 @@ def salary_responder_logic(input_message):
         employee_code = result.get("employee_code")
         if not employee_code:
             raise ValueError("employee_code not found.")
+        return employee_code
+    raise ValueError("No valid message found to extract employee_code.")
+
+def fetch_employee_record(endpoint_env, employee_code):
+    """
+    Backend record for the employee: from SUMMARY_ENDPOINT_URL (one cached call
+    for salary and vacancy) when configured, otherwise from the topic endpoint.
+    """
+    summary_url = os.getenv("SUMMARY_ENDPOINT_URL")
+    if summary_url:
+        return get_hr_client().employee_summary(summary_url, employee_code)
+    return get_hr_client().post_json(os.getenv(endpoint_env), {"employeeCode": employee_code})
+
+async def afetch_employee_record(endpoint_env, employee_code):
+    summary_url = os.getenv("SUMMARY_ENDPOINT_URL")
+    if summary_url:
+        return await get_hr_client().aemployee_summary(summary_url, employee_code)
+    return await get_hr_client().apost_json(os.getenv(endpoint_env), {"employeeCode": employee_code})
+
+### salary ###
+def salary_answer(api_result):
+    salary_days = api_result.get('YTDPayroll', '-1')
+
+    # The summary endpoint reports a missing value as null
+    if salary_days in (-1, None):
+        message = "No data available for this employee."
     else:
-        raise ValueError("No valid message found to extract employee_code.")
-    url = os.getenv("SALARY_ENDPOINT_URL")
-    payload = {"employeeCode": employee_code}
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        api_result = response.json()
-        
-        salary_days = api_result.get('YTDPayroll', '-1')
+        name = api_result.get('name')
+        message = f"{name}, your YTD salary is {salary_days}"
+    return SalaryResponse(answer=message).json()
 
-        if salary_days == -1:
-            message = "No data available for this employee."
-        else:
-            name = api_result.get('name')
-            message = f"{name}, your YTD salary is {salary_days}"
-        salary_response = SalaryResponse(answer=message)
+def salary_responder_logic(input_message):
+    employee_code = employee_code_from_classification(input_message)
+    try:
+        return salary_answer(fetch_employee_record("SALARY_ENDPOINT_URL", employee_code))
     except requests.RequestException as e:
-        salary_response = SalaryResponse(answer=f"Error: {str(e)}")
-    return salary_response.json()
+        return SalaryResponse(answer=f"Error: {str(e)}").json()
 
-salary_responder = salary_responder_logic | llm.bind_tools(
-    tools=[SalaryResponse], tool_choice="SalaryResponse"
-)
+async def asalary_responder_logic(input_message):
+    employee_code = employee_code_from_classification(input_message)
+    try:
+        return salary_answer(await afetch_employee_record("SALARY_ENDPOINT_URL", employee_code))
+    except (httpx.HTTPError, json.JSONDecodeError) as e:
+        return SalaryResponse(answer=f"Error: {str(e)}").json()
+
+def salary_responder_deterministic(input_message):
+    return build_tool_call_message("SalaryResponse", salary_responder_logic(input_message))
+
+async def asalary_responder_deterministic(input_message):
+    return build_tool_call_message("SalaryResponse", await asalary_responder_logic(input_message))
+
+salary_response_llm = llm.bind_tools(tools=[SalaryResponse], tool_choice="SalaryResponse")
+
+salary_responder_llm = salary_responder_logic | salary_response_llm
+
+async def asalary_responder_llm(input_message):
+    return await salary_response_llm.ainvoke(await asalary_responder_logic(input_message))
 
 
 ### vacancy ###
-def vacancy_responder_logic(input_message):
-    if hasattr(input_message[-1], 'additional_kwargs') and \
-        'tool_calls' in input_message[-1].additional_kwargs:
-        tool_calls = input_message[-1].additional_kwargs['tool_calls']
-        last_tool = tool_calls[-1]
-        arguments = last_tool['function']['arguments']
-        result = json.loads(arguments)
-        employee_code = result.get("employee_code")
-        if not employee_code:
-            raise ValueError("employee_code not found.")
+def vacancy_answer(api_result):
+    vacancy_days = api_result.get('vacancyBalanceDays', '-1')
+
+    if vacancy_days in (-1, None):
+        message = "No data available for this employee."
     else:
-        raise ValueError("No valid message found to extract employee_code.")
-    url = os.getenv("VACANCY_ENDPOINT_URL")
-    
-    payload = {"employeeCode": employee_code}
+        name = api_result.get('name')
+        message = f"Your vacancy balance days is {vacancy_days}, {name}. Enjoy your time off!"
+    return VacancyResponse(answer=message).json()
+
+def vacancy_responder_logic(input_message):
+    employee_code = employee_code_from_classification(input_message)
     try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        api_result = response.json()
+        return vacancy_answer(fetch_employee_record("VACANCY_ENDPOINT_URL", employee_code))
+    except requests.RequestException as e:
+        return VacancyResponse(answer=f"Error: {str(e)}").json()
 
-        vacancy_days = api_result.get('vacancyBalanceDays', '-1')
+async def avacancy_responder_logic(input_message):
+    employee_code = employee_code_from_classification(input_message)
+    try:
+        return vacancy_answer(await afetch_employee_record("VACANCY_ENDPOINT_URL", employee_code))
+    except (httpx.HTTPError, json.JSONDecodeError) as e:
+        return VacancyResponse(answer=f"Error: {str(e)}").json()
 
-        if vacancy_days == -1:
-            message = "No data available for this employee."
-        else:
-            name = api_result.get('name')
-            message = f"Your vacancy balance days is {vacancy_days}, {name}. Enjoy your time off!"
-        vacancy_response = VacancyResponse(answer=message)
-    except requests.RequestException as e:
-        vacancy_response = VacancyResponse(answer=f"Error: {str(e)}")
-    return vacancy_response.json()
+def vacancy_responder_deterministic(input_message):
+    return build_tool_call_message("VacancyResponse", vacancy_responder_logic(input_message))
 
-vacancy_responder = vacancy_responder_logic | llm.bind_tools(
-    tools=[VacancyResponse], tool_choice="VacancyResponse"
-)
+async def avacancy_responder_deterministic(input_message):
+    return build_tool_call_message("VacancyResponse", await avacancy_responder_logic(input_message))
+
+vacancy_response_llm = llm.bind_tools(tools=[VacancyResponse], tool_choice="VacancyResponse")
+
+vacancy_responder_llm = vacancy_responder_logic | vacancy_response_llm
+
+async def avacancy_responder_llm(input_message):
+    return await vacancy_response_llm.ainvoke(await avacancy_responder_logic(input_message))
+
+### HR responders mode ###
+# 'deterministic' answers salary/vacancy turns from the backend template only;
+# 'llm' keeps the previous behaviour of echoing the template through the model.
+HR_RESPONDER_MODE = os.getenv("HR_RESPONDER_MODE", "deterministic").lower()
+
+if HR_RESPONDER_MODE == "llm":
+    salary_responder = salary_responder_llm
+    vacancy_responder = vacancy_responder_llm
+    asalary_responder = asalary_responder_llm
+    avacancy_responder = avacancy_responder_llm
+else:
+    salary_responder = salary_responder_deterministic
+    vacancy_responder = vacancy_responder_deterministic
+    asalary_responder = asalary_responder_deterministic
+    avacancy_responder = avacancy_responder_deterministic
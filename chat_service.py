@@ -0,0 +1,214 @@
+"""
+Headless chat service: the assistant's async graph behind an HTTP API.
+
+Each worker process builds create_async_graph() once at startup and serves
+any number of concurrent conversations from one event loop. Conversations
+are identified by a session id and their recent history is kept in the
+worker's memory, so behind a load balancer a session must be routed to the
+same worker (e.g. sticky routing on the session id). Clients may pass their
+own session id, such as a Teams conversation id; unknown ids start a new session.
+
+Endpoints:
+    POST   /chat                  {"message", "session_id"?} -> {"session_id", "answer"}
+    POST   /chat/stream           same body, answered as server-sent events:
+                                  "session" {session_id}, "token" {text}..., then "final" {session_id, answer} or "error" {detail}
+    GET    /chat/sessions/{id}    history of a session
+    DELETE /chat/sessions/{id}
+    GET    /health
+    GET    /hr/stats              calls, errors and p50/p95/p99 latency per HR backend endpoint
+
+Run with `bash start_chat_service.ch`.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from langchain_core.messages import AIMessage, HumanMessage
+
+from classes import FinalResponse
+from graph import astream_turn, create_async_graph
+from services.hr_client import get_hr_client
+
+logger = logging.getLogger(__name__)
+
+MAX_HISTORY = int(os.getenv("CHAT_MAX_HISTORY", "10"))
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(min_length=1)
+    session_id: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    session_id: str
+    answer: str
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class SessionHistory(BaseModel):
+    session_id: str
+    messages: List[ChatMessage]
+
+
+class Session:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.history = []
+        self.last_used = time.monotonic()
+        # One turn at a time per conversation; different sessions run concurrently
+        self.lock = asyncio.Lock()
+
+
+class SessionStore:
+    """
+    In-memory conversations of this worker. Sessions idle for longer than
+    ttl_seconds are dropped, and the least recently used ones beyond max_sessions.
+    """
+
+    def __init__(self, ttl_seconds=None, max_sessions=None):
+        self.ttl_seconds = ttl_seconds or float(os.getenv("CHAT_SESSION_TTL_SECONDS", "3600"))
+        self.max_sessions = max_sessions or int(os.getenv("CHAT_MAX_SESSIONS", "10000"))
+        self._sessions = OrderedDict()
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used <= self.ttl_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def get(self, session_id):
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def get_or_create(self, session_id=None):
+        """The session with this id, or a new one (with this id, or a generated one when None)."""
+        session = self.get(session_id) if session_id else None
+        if session is None:
+            session = Session(session_id or uuid.uuid4().hex)
+            self._sessions[session.session_id] = session
+            self._expire()
+        return session
+
+    def delete(self, session_id):
+        return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def turn_messages(session, message):
+    """History plus the new user message, truncated like the Streamlit apps."""
+    return (session.history + [HumanMessage(content=message)])[-MAX_HISTORY:]
+
+
+def record_turn(session, messages, answer):
+    session.history = (messages + [AIMessage(content=answer)])[-MAX_HISTORY:]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.graph = create_async_graph()
+    app.state.sessions = SessionStore()
+    logger.info("Chat graph ready")
+    yield
+    get_hr_client().log_stats()
+    await get_hr_client().aclose()
+
+
+app = FastAPI(title="Delta Logistic Assistant", lifespan=lifespan)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
+    session = http_request.app.state.sessions.get_or_create(request.session_id)
+    async with session.lock:
+        messages = turn_messages(session, request.message)
+        response = await http_request.app.state.graph.ainvoke(messages)
+        answer = FinalResponse.model_validate_json(response[-1].content).answer
+        record_turn(session, messages, answer)
+    return ChatResponse(session_id=session.session_id, answer=answer)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Answer one turn as server-sent events. Tokens are sent as the global
+    responder generates them; the turn is only added to the history once the
+    final answer is complete.
+    """
+    session = http_request.app.state.sessions.get_or_create(request.session_id)
+    graph = http_request.app.state.graph
+
+    async def events():
+        yield sse_event("session", {"session_id": session.session_id})
+        async with session.lock:
+            messages = turn_messages(session, request.message)
+            try:
+                async for kind, value in astream_turn(graph, messages):
+                    if kind == "token":
+                        yield sse_event("token", {"text": value})
+                    else:
+                        record_turn(session, messages, value.answer)
+                        yield sse_event("final", {"session_id": session.session_id, "answer": value.answer})
+            except Exception as e:
+                logger.error(f"Chat turn failed for session {session.session_id}: {e}")
+                yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session.session_id},
+    )
+
+
+@app.get("/chat/sessions/{session_id}", response_model=SessionHistory)
+async def get_session(session_id: str, http_request: Request):
+    session = http_request.app.state.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return SessionHistory(
+        session_id=session_id,
+        messages=[
+            ChatMessage(role="user" if isinstance(m, HumanMessage) else "assistant", content=m.content)
+            for m in session.history
+        ],
+    )
+
+
+@app.delete("/chat/sessions/{session_id}", status_code=204)
+async def delete_session(session_id: str, http_request: Request):
+    if not http_request.app.state.sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+@app.get("/health")
+async def health(http_request: Request):
+    return {"status": "ok", "sessions": len(http_request.app.state.sessions)}
+
+
+@app.get("/hr/stats")
+async def hr_stats():
+    return get_hr_client().stats.snapshot()
@@ -0,0 +1,98 @@
+import json
+from langgraph.graph import MessageGraph
+from langchain_core.messages import AIMessageChunk, BaseMessage
+
+from classes import FinalResponse
+
+from chains import (
+    classifier_responder, final_responder, global_responder, salary_responder, vacancy_responder,
+    aclassifier_responder, afinal_responder, aglobal_responder, asalary_responder, avacancy_responder,
+)
+
+
+def decision_flow(state: list[BaseMessage]) -> str:
+    last_message = state[-1]
+    if hasattr(last_message, 'additional_kwargs') and 'tool_calls' in last_message.additional_kwargs:
+        tool_calls = last_message.additional_kwargs['tool_calls']
+        if tool_calls:
+            last_tool = tool_calls[-1]
+            arguments = last_tool['function']['arguments']
+            result = json.loads(arguments)
+            if result.get("request_type") == "global_question":
+                return "global"
+            elif result.get("request_type") == "salary_request":
+                return "salary"
+            elif result.get("request_type") == "vacancy_request":
+                return "vacancy"
+    return "final"
+
+
+def build_graph(classifier, global_node, salary_node, vacancy_node, final_node):
+    builder = MessageGraph()
+    builder.add_node("classifier", classifier)
+    builder.add_node("global", global_node)
+    builder.add_node("salary", salary_node)
+    builder.add_node("vacancy", vacancy_node)
+    builder.add_node("final", final_node)
+    builder.add_conditional_edges("classifier", decision_flow)
+    builder.add_edge("global", "final")
+    builder.add_edge("salary", "final")
+    builder.add_edge("vacancy", "final")
+    builder.set_entry_point("classifier")
+    return builder.compile()
+
+
+def create_graph(classifier=classifier_responder):
+    """Graph with the synchronous nodes, run with graph.invoke."""
+    return build_graph(classifier, global_responder, salary_responder, vacancy_responder, final_responder)
+
+
+def create_async_graph(classifier=aclassifier_responder):
+    """
+    Graph with the async nodes, run with `await graph.ainvoke(messages)`.
+    Model, embedding and HR backend calls are awaited, so one event loop can
+    serve many conversations at once.
+    """
+    return build_graph(classifier, aglobal_responder, asalary_responder, avacancy_responder, afinal_responder)
+
+
+# Nodes whose model output is the answer text itself (see chains.stream_global_response)
+STREAMING_NODES = ("global",)
+
+
+def answer_token(chunk, metadata):
+    """The answer text carried by a "messages" stream chunk, or None for other model output."""
+    if metadata.get("langgraph_node") in STREAMING_NODES and isinstance(chunk, AIMessageChunk):
+        return chunk.content or None
+    return None
+
+
+def stream_turn(graph, messages):
+    """
+    Run one turn of a synchronous graph, yielding ("token", text) as the answer
+    tokens are generated and finally ("final", FinalResponse) once the graph
+    ends. Turns answered without streaming (salary, vacancy, semantic cache
+    hits) only yield the final response.
+    """
+    state = None
+    for mode, payload in graph.stream(messages, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            token = answer_token(*payload)
+            if token:
+                yield "token", token
+        else:
+            state = payload
+    yield "final", FinalResponse.model_validate_json(state[-1].content)
+
+
+async def astream_turn(graph, messages):
+    """Async variant of stream_turn, for graphs built with create_async_graph."""
+    state = None
+    async for mode, payload in graph.astream(messages, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            token = answer_token(*payload)
+            if token:
+                yield "token", token
+        else:
+            state = payload
+    yield "final", FinalResponse.model_validate_json(state[-1].content)
@@ -1,6 +1,5 @@
 import streamlit as st
 from services.Intranet_repository_s3 import IntranetRepository
-import os
 import time
 
 def reindex_documents():
@@ -13,20 +12,12 @@ def reindex_documents():
         with st.sidebar:
             with st.spinner("Reindexando documentos..."):
                 try:
-                    # Remove existing index if it exists
-                    index_path = "faiss_index"
-                    if os.path.exists(f"{index_path}/index.faiss"):
-                        os.remove(f"{index_path}/index.faiss")
-                        os.remove(f"{index_path}/index.pkl")
-                        st.info("Índice existente removido.")
-                    
-                    # Reset the singleton instance
+                    # Build and atomically publish a new index version;
+                    # the current index keeps serving until it is ready
                     repository = IntranetRepository(bucket_name="docs-intranet")
-                    repository._vectorstore = None
-                    
-                    # Recreate the index
                     start_time = time.time()
-                    repository.create_or_load_faiss_index()
+                    if repository.force_rebuild_index() is None:
+                        raise ValueError("Falha ao criar índice FAISS. A versão anterior continua ativa.")
                     elapsed_time = time.time() - start_time
                     
                     st.success(f"Documentos reindexados com sucesso em {elapsed_time:.2f} segundos.")
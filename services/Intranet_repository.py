@@ -4,6 +4,13 @@ from langchain.vectorstores import FAISS
 from langchain.embeddings.openai import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from services.index_store import (
+    get_index_version, index_exists, load_vectorstore, publish_vectorstore,
+    resolve_index_dir, rollback_version
+)
+from services.retrieval import retrieve_documents
+from services.embedding_store import CachedEmbeddings, get_embedding_store
+from services.index_builder import build_faiss_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,6 +19,7 @@ logger = logging.getLogger(__name__)
 class IntranetRepository:
     _instance = None  # Singleton instance
     _vectorstore = None 
+    _loaded_version = None  # Index version held in _vectorstore
     
     # Configuration constants
     CHUNK_SIZE = 300
@@ -80,16 +88,9 @@ class IntranetRepository:
             return IntranetRepository._vectorstore
 
         # If the index exists on disk and we don't need to rebuild, load it
-        if os.path.exists(self.index_path) and os.path.isfile(f"{self.index_path}/index.faiss") and not force_rebuild:
-            logger.info(f"Loading FAISS index from {self.index_path}")
+        if index_exists(self.index_path) and not force_rebuild:
             try:
-                IntranetRepository._vectorstore = FAISS.load_local(
-                    self.index_path,
-                    OpenAIEmbeddings(),
-                    allow_dangerous_deserialization=True
-                )
-                logger.info("Successfully loaded FAISS index")
-                return IntranetRepository._vectorstore
+                return self._load_published_index()
             except Exception as e:
                 logger.error(f"Error loading FAISS index: {e}")
                 logger.info("Will rebuild the index...")
@@ -108,34 +109,18 @@ class IntranetRepository:
             
             # Create embeddings and FAISS index
             logger.info(f"Creating FAISS index from {len(chunks)} chunks")
-            embeddings = OpenAIEmbeddings()
+            # Only chunks that are not already in the embedding store are sent to OpenAI
+            embeddings = CachedEmbeddings(OpenAIEmbeddings(), get_embedding_store())
             
-            # Create index in batches to avoid memory issues
-            batch_size = 100
-            if len(chunks) <= batch_size:
-                # Create index directly if number of chunks is small
-                IntranetRepository._vectorstore = FAISS.from_documents(chunks, embeddings)
-            else:
-                # Create index in batches for larger sets
-                logger.info(f"Creating index in batches of {batch_size} chunks")
-                # Create first batch
-                first_batch = chunks[:batch_size]
-                IntranetRepository._vectorstore = FAISS.from_documents(first_batch, embeddings)
-                
-                # Add remaining batches
-                for i in range(batch_size, len(chunks), batch_size):
-                    end_idx = min(i + batch_size, len(chunks))
-                    logger.info(f"Adding batch {i//batch_size + 1}: chunks {i} to {end_idx}")
-                    batch = chunks[i:end_idx]
-                    if batch:
-                        IntranetRepository._vectorstore.add_documents(batch)
-            
-            # Ensure the directory exists
-            os.makedirs(self.index_path, exist_ok=True)
+            # Embed batches concurrently within the rate limits, then add them to FAISS in bulk
+            vectorstore = build_faiss_index(chunks, embeddings)
+            logger.info(f"Embedding store: {embeddings.hits} cached, {embeddings.misses} embedded")
             
-            # Save the index
-            IntranetRepository._vectorstore.save_local(self.index_path)
-            logger.info(f"FAISS index created and saved to {self.index_path}")
+            # Save into a new version and publish it; the live index keeps serving until then
+            version, new_vectorstore = publish_vectorstore(self.index_path, vectorstore, OpenAIEmbeddings())
+            IntranetRepository._vectorstore = new_vectorstore
+            IntranetRepository._loaded_version = version
+            logger.info(f"FAISS index created and published as {version} in {self.index_path}")
             
             return IntranetRepository._vectorstore
             
@@ -143,16 +128,45 @@ class IntranetRepository:
             logger.error(f"Error creating FAISS index: {e}")
             return None
 
-    def query_document(self, question, k=3):
-        """Query the FAISS index with a question and return relevant context."""
+    def _load_published_index(self):
+        """Load the currently published index from disk and swap it in."""
+        version = self.get_index_version()
+        index_dir = resolve_index_dir(self.index_path)
+        logger.info(f"Loading FAISS index from {index_dir}")
+        vectorstore = load_vectorstore(index_dir, OpenAIEmbeddings())
+        IntranetRepository._vectorstore = vectorstore
+        IntranetRepository._loaded_version = version
+        logger.info("Successfully loaded FAISS index")
+        return vectorstore
+
+    def get_vectorstore(self):
+        """
+        Return the live vectorstore, hot-swapping in a newer published version
+        (e.g. one built by another process) when the version on disk changed.
+        If the new version cannot be loaded, the current one keeps serving.
+        """
+        if IntranetRepository._vectorstore is None:
+            return self.create_or_load_faiss_index()
+        version = self.get_index_version()
+        if version is not None and version != IntranetRepository._loaded_version:
+            try:
+                self._load_published_index()
+            except Exception as e:
+                logger.error(f"Error loading index version {version}, keeping current one: {e}")
+        return IntranetRepository._vectorstore
+
+    def query_document(self, question, k=3, source=None, prefix=None):
+        """
+        Query the FAISS index with a question and return relevant context.
+        source/prefix restrict the search to one document or to a key prefix (e.g. a department folder).
+        """
         if IntranetRepository._vectorstore is None:
             logger.error("FAISS index is not loaded. Trying to load it now.")
-            self.create_or_load_faiss_index()
-            
-            if IntranetRepository._vectorstore is None:
-                raise ValueError("Failed to load FAISS index. Call create_or_load_faiss_index first.")
+        vectorstore = self.get_vectorstore()
+        if vectorstore is None:
+            raise ValueError("Failed to load FAISS index. Call create_or_load_faiss_index first.")
         
-        docs = IntranetRepository._vectorstore.similarity_search(question, k=k)
+        docs = retrieve_documents(question, vectorstore, k=k, source=source, prefix=prefix)
         
         if docs:
             # Format the results to include source information
@@ -166,40 +180,24 @@ class IntranetRepository:
         
         return "No relevant information found."
         
+    def get_index_version(self):
+        """Return the version of the index currently on disk (changes on every rebuild)."""
+        return get_index_version(self.index_path)
+
     def force_rebuild_index(self):
-        """Force rebuild the index from scratch."""
-        logger.info(f"Attempting to remove existing index at {self.index_path}")
-        
-        try:
-            # Check and remove specific files first
-            index_files = [
-                os.path.join(self.index_path, "index.faiss"),
-                os.path.join(self.index_path, "index.pkl")
-            ]
-            
-            for file_path in index_files:
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        logger.info(f"Successfully removed {file_path}")
-                    except Exception as e:
-                        logger.error(f"Error removing {file_path}: {e}")
-            
-            # Check if directory is empty and remove it if it is
-            if os.path.exists(self.index_path) and os.path.isdir(self.index_path):
-                if not os.listdir(self.index_path):  # If empty
-                    try:
-                        os.rmdir(self.index_path)
-                        logger.info(f"Successfully removed empty directory {self.index_path}")
-                    except Exception as e:
-                        logger.error(f"Error removing directory {self.index_path}: {e}")
-        except Exception as e:
-            logger.error(f"Error during index cleanup: {e}")
-        
-        # Reset vectorstore - IMPORTANT: reset class variable
-        logger.info("Resetting vector store in memory")
-        IntranetRepository._vectorstore = None
-        
-        # Recreate index with force_rebuild=True to ensure new creation
+        """
+        Force rebuild the index from scratch.
+
+        The new index is built into a staging version and published atomically;
+        queries keep using the current index until the new one has loaded cleanly.
+        """
         logger.info("Rebuilding index from scratch")
-        return self.create_or_load_faiss_index(force_rebuild=True)
\ No newline at end of file
+        return self.create_or_load_faiss_index(force_rebuild=True)
+
+    def rollback_index(self):
+        """Publish the previous index version again and swap it in. Returns it, or None."""
+        version = rollback_version(self.index_path)
+        if version is None:
+            logger.warning("No previous index version to roll back to")
+            return None
+        return self._load_published_index()
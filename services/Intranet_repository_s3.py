@@ -1,27 +1,67 @@
 import os
-import tempfile
 import boto3
 from langchain.vectorstores import FAISS
 from langchain.embeddings.openai import OpenAIEmbeddings
 from langchain.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from services.index_store import (
+    get_index_version, index_exists, load_manifest, load_vectorstore,
+    publish_vectorstore, resolve_index_dir, rollback_version
+)
+from services.retrieval import retrieve_documents
+from services.embedding_store import CachedEmbeddings, get_embedding_store
+from services.index_builder import build_faiss_index, embed_texts_concurrently
+from services.ann_index import index_type_of, supports_incremental_updates
+from services.chunking import (
+    create_chunk_executor, default_chunk_workers, records_to_documents, split_text_records
+)
 import logging
-import shutil
 import concurrent.futures
+import threading
+import uuid
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+class ByteBudget:
+    """
+    Limit the number of bytes held in memory by concurrent downloads.
+    A caller blocks while the budget is exhausted; an object larger than the
+    whole budget is still allowed when nothing else is in flight.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size):
+        with self._condition:
+            while self.in_flight and self.in_flight + size > self.limit:
+                self._condition.wait()
+            self.in_flight += size
+
+    def release(self, size):
+        with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
+
 class IntranetRepository:
     _instance = None  # Singleton instance
     _vectorstore = None 
+    _loaded_version = None  # Versão do índice carregada em _vectorstore
     
     # Constantes para configuração
     CHUNK_SIZE = 300  # Tamanho reduzido dos chunks para 500 caracteres
     CHUNK_OVERLAP = 50  # Overlap menor para acompanhar o tamanho menor do chunk
     MAX_WORKERS = 4  # Número máximo de workers para processamento paralelo
+    MAX_INFLIGHT_BYTES = 64 * 1024 * 1024  # Bytes de objetos S3 em memória ao mesmo tempo
+    CHUNKING_MODE = os.getenv("CHUNKING_MODE", "thread")  # 'thread' ou 'process' (divisão em múltiplos processos)
+    CHUNK_WORKERS = default_chunk_workers()  # Processos usados no modo 'process'
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -35,158 +75,150 @@ class IntranetRepository:
         self.index_path = index_path
         self.s3_client = boto3.client('s3')
         
+    VALID_EXTENSIONS = ('.txt', '.md', '.csv', '.json')
+
+    def list_document_objects(self):
+        """
+        List the relevant objects in the S3 bucket with the metadata used by
+        the incremental sync manifest.
+
+        Returns:
+            list: Dicts with 'key', 'etag', 'size' and 'last_modified'
+        """
+        # list_objects_v2 returns at most 1,000 keys per call; the paginator follows continuation tokens
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket_name):
+            for item in page.get('Contents', []):
+                if not any(item['Key'].lower().endswith(ext) for ext in self.VALID_EXTENSIONS):
+                    continue
+                objects.append({
+                    'key': item['Key'],
+                    'etag': item.get('ETag'),
+                    'size': item.get('Size'),
+                    'last_modified': item['LastModified'].isoformat() if item.get('LastModified') else None,
+                })
+        return objects
+
     def list_documents_in_bucket(self):
         """List all documents in the S3 bucket."""
         try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name)
-            if 'Contents' in response:
-                # Filtrar apenas arquivos relevantes (.txt, .md, .csv, .json)
-                valid_extensions = ('.txt', '.md', '.csv', '.json')
-                valid_files = [
-                    item['Key'] for item in response['Contents']
-                    if any(item['Key'].lower().endswith(ext) for ext in valid_extensions)
-                ]
-                
+            valid_files = [obj['key'] for obj in self.list_document_objects()]
+            if valid_files:
                 logger.info(f"Found {len(valid_files)} valid documents in bucket {self.bucket_name}")
                 return valid_files
-                
+
             logger.warning(f"No documents found in bucket {self.bucket_name}")
             return []
         except Exception as e:
             logger.error(f"Error listing objects in S3 bucket: {e}")
             return []
 
-    def download_file(self, file_key, temp_dir):
-        """
-        Download a single file from S3.
+    def decode_content(self, data, file_key):
+        """Decode document bytes as UTF-8, falling back to latin-1."""
+        try:
+            return data.decode('utf-8')
+        except UnicodeDecodeError:
+            logger.warning(f"UTF-8 decoding failed for {file_key}, trying latin-1")
+            return data.decode('latin-1')
+
+    def split_text(self, file_key, text_content):
+        """Split the text of one document into chunks tagged with its source key."""
+        # Criar documento único
+        doc = Document(
+            page_content=text_content,
+            metadata={'source': file_key}
+        )
         
-        Args:
-            file_key: The key of the file in S3 bucket
-            temp_dir: Temporary directory to save the file
+        # Dividir em chunks menores
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.CHUNK_SIZE,
+            chunk_overlap=self.CHUNK_OVERLAP
+        )
+        
+        chunks = text_splitter.split_documents([doc])
+        
+        # Garantir que todos os chunks mantenham a informação de origem
+        for chunk in chunks:
+            chunk.metadata['source'] = file_key
             
-        Returns:
-            tuple: (file_key, local_file_path) or None if failed
-        """
+        logger.info(f"Split {file_key} into {len(chunks)} chunks of ~{self.CHUNK_SIZE} chars")
+        return chunks
+
+    def fetch_object_text(self, file_key):
+        """Read an S3 object into memory and return its decoded text."""
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_key)
+        body = response['Body']
         try:
-            temp_file_path = os.path.join(temp_dir, os.path.basename(file_key))
-            self.s3_client.download_file(self.bucket_name, file_key, temp_file_path)
-            return (file_key, temp_file_path)
-        except Exception as e:
-            logger.error(f"Error downloading {file_key}: {e}")
-            return None
+            return self.decode_content(body.read(), file_key)
+        finally:
+            body.close()
 
-    def download_files_from_s3(self):
-        """Download all files from S3 to a temporary directory and return their paths."""
-        temp_dir = tempfile.mkdtemp()
-        file_paths = []
-        
+    def stream_single_object(self, obj, budget, chunk_executor=None):
+        """
+        Fetch one object within the byte budget and split it, without touching disk.
+        With a chunk_executor the split runs in a worker process.
+
+        Returns:
+            tuple: (file_key, chunks), with chunks None if the object could not be read
+        """
+        size = obj.get('size') or 0
+        budget.acquire(size)
         try:
-            files = self.list_documents_in_bucket()
-            if not files:
-                return temp_dir, []
-                
-            logger.info(f"Downloading {len(files)} files in parallel")
-            
-            # Usar processamento paralelo para download
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
-                futures = [executor.submit(self.download_file, file_key, temp_dir) for file_key in files]
-                
-                for future in concurrent.futures.as_completed(futures):
-                    result = future.result()
-                    if result:
-                        file_paths.append(result)
-                
-            logger.info(f"Successfully downloaded {len(file_paths)} files to {temp_dir}")
-            return temp_dir, file_paths
+            text_content = self.fetch_object_text(obj['key'])
+            if chunk_executor is None:
+                return obj['key'], self.split_text(obj['key'], text_content)
+            source, texts = chunk_executor.submit(
+                split_text_records, obj['key'], text_content, self.CHUNK_SIZE, self.CHUNK_OVERLAP
+            ).result()
+            return source, records_to_documents(source, texts)
         except Exception as e:
-            logger.error(f"Error in download process: {e}")
-            raise
+            logger.error(f"Error streaming {obj['key']}: {e}")
+            return obj['key'], None
+        finally:
+            budget.release(size)
 
-    def process_single_file(self, file_info):
+    def load_documents_from_s3(self, objects):
         """
-        Process a single file and return its documents.
-        
+        Stream objects from S3 straight into the splitter with at most MAX_WORKERS
+        concurrent reads and MAX_INFLIGHT_BYTES of object bodies in memory.
+
         Args:
-            file_info: Tuple of (file_key, file_path)
-            
+            objects: Dicts from list_document_objects()
+
         Returns:
-            list: List of Document objects or empty list if failed
+            tuple: (list of Document chunks, set of keys that were read successfully)
         """
-        file_key, file_path = file_info
-        documents = []
-        
-        try:
-            # Verificar se é um arquivo de texto
-            if not any(file_path.endswith(ext) for ext in ('.txt', '.md', '.csv', '.json')):
-                logger.warning(f"Skipping unsupported file type: {file_key}")
-                return []
-                
-            # Carregar conteúdo do arquivo com tratamento de encoding
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text_content = f.read()
-            except UnicodeDecodeError:
-                logger.warning(f"UTF-8 decoding failed for {file_key}, trying latin-1")
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    text_content = f.read()
-            
-            # Criar documento único
-            doc = Document(
-                page_content=text_content,
-                metadata={'source': file_key}
-            )
-            
-            # Dividir em chunks menores
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.CHUNK_SIZE,
-                chunk_overlap=self.CHUNK_OVERLAP
-            )
-            
-            chunks = text_splitter.split_documents([doc])
-            
-            # Garantir que todos os chunks mantenham a informação de origem
-            for chunk in chunks:
-                chunk.metadata['source'] = file_key
-                
-            logger.info(f"Split {file_key} into {len(chunks)} chunks of ~{self.CHUNK_SIZE} chars")
-            return chunks
-            
-        except Exception as e:
-            logger.error(f"Error processing file {file_key}: {e}")
-            return []
+        if not objects:
+            logger.warning("No objects provided to load documents from")
+            return [], set()
 
-    def load_documents_from_file_paths(self, file_paths):
-        """Load documents from file paths and return a list of Document objects."""
-        if not file_paths:
-            logger.warning("No file paths provided to load documents from")
-            return []
-            
-        logger.info(f"Processing {len(file_paths)} files in parallel")
+        logger.info(f"Streaming {len(objects)} objects from S3")
+        budget = ByteBudget(self.MAX_INFLIGHT_BYTES)
         all_documents = []
-        
-        # Processar arquivos em paralelo
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
-            futures = [executor.submit(self.process_single_file, file_info) for file_info in file_paths]
-            
-            for future in concurrent.futures.as_completed(futures):
-                chunks = future.result()
-                all_documents.extend(chunks)
-        
-        # Agrupar por fonte para logging
-        sources = {}
-        for doc in all_documents:
-            source = doc.metadata.get('source', 'Unknown')
-            if source in sources:
-                sources[source] += 1
-            else:
-                sources[source] = 1
-                
-        # Log estatísticas
-        logger.info(f"Total chunks created: {len(all_documents)}")
-        for source, count in sources.items():
-            logger.info(f"  {source}: {count} chunks")
-            
-        return all_documents
+        loaded_keys = set()
+
+        chunk_executor = create_chunk_executor(self.CHUNKING_MODE, self.CHUNK_WORKERS)
+        # In process mode keep enough readers in flight to feed every worker process
+        io_workers = max(self.MAX_WORKERS, self.CHUNK_WORKERS) if chunk_executor else self.MAX_WORKERS
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=io_workers) as executor:
+                futures = [
+                    executor.submit(self.stream_single_object, obj, budget, chunk_executor)
+                    for obj in objects
+                ]
+
+                for future in concurrent.futures.as_completed(futures):
+                    file_key, chunks = future.result()
+                    if chunks is not None:
+                        loaded_keys.add(file_key)
+                        all_documents.extend(chunks)
+        finally:
+            if chunk_executor is not None:
+                chunk_executor.shutdown()
+
+        logger.info(f"Total chunks created: {len(all_documents)} from {len(loaded_keys)} objects")
+        return all_documents, loaded_keys
 
     def create_or_load_faiss_index(self, force_rebuild=False):
         """
@@ -199,16 +231,9 @@ class IntranetRepository:
             return IntranetRepository._vectorstore
 
         # Se o índice existir em disco e não precisamos reconstruir, carregue-o
-        if os.path.exists(self.index_path) and os.path.isfile(f"{self.index_path}/index.faiss") and not force_rebuild:
-            logger.info(f"Loading FAISS index from {self.index_path}")
+        if index_exists(self.index_path) and not force_rebuild:
             try:
-                IntranetRepository._vectorstore = FAISS.load_local(
-                    self.index_path,
-                    OpenAIEmbeddings(),
-                    allow_dangerous_deserialization=True
-                )
-                logger.info("Successfully loaded FAISS index")
-                return IntranetRepository._vectorstore
+                return self._load_published_index()
             except Exception as e:
                 logger.error(f"Error loading FAISS index: {e}")
                 logger.info("Will rebuild the index...")
@@ -218,77 +243,204 @@ class IntranetRepository:
         logger.info(f"Creating FAISS index from S3 documents")
         
         try:
-            # Download all files from S3
-            start_time = logger.info("Starting download from S3")
-            temp_dir, file_paths = self.download_files_from_s3()
+            # Stream all documents from S3 directly into the splitter
+            objects = self.list_document_objects()
             
-            if not file_paths:
+            if not objects:
                 logger.warning("No files found in the S3 bucket.")
                 return None
             
-            # Load and process documents from downloaded files
-            logger.info("Processing downloaded files")
-            chunks = self.load_documents_from_file_paths(file_paths)
+            chunks, loaded = self.load_documents_from_s3(objects)
             
             if not chunks:
                 logger.warning("No chunks created from files.")
-                # Clean up temporary directory
-                shutil.rmtree(temp_dir)
                 return None
             
             # Create embeddings and FAISS index
             logger.info(f"Creating FAISS index from {len(chunks)} chunks")
-            embeddings = OpenAIEmbeddings()
+            # Only chunks that are not already in the embedding store are sent to OpenAI
+            embeddings = CachedEmbeddings(OpenAIEmbeddings(), get_embedding_store())
             
-            # Criar índice em lotes para evitar problemas de memória
-            batch_size = 100  # Tamanho do lote para criação do índice
-            if len(chunks) <= batch_size:
-                # Criar índice diretamente se o número de chunks for pequeno
-                IntranetRepository._vectorstore = FAISS.from_documents(chunks, embeddings)
-            else:
-                # Criar índice por lotes para conjuntos maiores
-                logger.info(f"Creating index in batches of {batch_size} chunks")
-                # Criar primeiro lote
-                first_batch = chunks[:batch_size]
-                IntranetRepository._vectorstore = FAISS.from_documents(first_batch, embeddings)
-                
-                # Adicionar lotes restantes
-                for i in range(batch_size, len(chunks), batch_size):
-                    end_idx = min(i + batch_size, len(chunks))
-                    logger.info(f"Adding batch {i//batch_size + 1}: chunks {i} to {end_idx}")
-                    batch = chunks[i:end_idx]
-                    if batch:  # Verificar se o lote não está vazio
-                        IntranetRepository._vectorstore.add_documents(batch)
-            
-            # Ensure the directory exists
-            os.makedirs(self.index_path, exist_ok=True)
-            
-            # Save the index
-            IntranetRepository._vectorstore.save_local(self.index_path)
-            logger.info(f"FAISS index created and saved to {self.index_path}")
+            # IDs explícitos permitem remover os chunks de um arquivo na sincronização incremental
+            ids = [str(uuid.uuid4()) for _ in chunks]
+
+            # Gerar embeddings em lotes concorrentes respeitando os limites de taxa e adicionar ao FAISS de uma vez
+            vectorstore = build_faiss_index(chunks, embeddings, ids=ids)
             
-            # Clean up temporary directory
-            shutil.rmtree(temp_dir)
-            logger.info(f"Temporary directory {temp_dir} removed")
+            logger.info(f"Embedding store: {embeddings.hits} cached, {embeddings.misses} embedded")
+
+            # Salvar em uma nova versão e publicá-la; o índice atual continua servindo até lá
+            version, new_vectorstore = publish_vectorstore(
+                self.index_path, vectorstore, OpenAIEmbeddings(),
+                manifest=self.build_manifest(objects, chunks, ids, loaded)
+            )
+            IntranetRepository._vectorstore = new_vectorstore
+            IntranetRepository._loaded_version = version
+            logger.info(f"FAISS index created and published as {version} in {self.index_path}")
             
             return IntranetRepository._vectorstore
             
         except Exception as e:
             logger.error(f"Error creating FAISS index: {e}")
-            if 'temp_dir' in locals() and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
             return None
 
-    def query_document(self, question, k=3):
-        """Query the FAISS index with a question and return relevant context."""
+    def _load_published_index(self):
+        """Load the currently published index from disk and swap it in."""
+        version = self.get_index_version()
+        index_dir = resolve_index_dir(self.index_path)
+        logger.info(f"Loading FAISS index from {index_dir}")
+        vectorstore = load_vectorstore(index_dir, OpenAIEmbeddings())
+        IntranetRepository._vectorstore = vectorstore
+        IntranetRepository._loaded_version = version
+        logger.info("Successfully loaded FAISS index")
+        return vectorstore
+
+    def get_vectorstore(self):
+        """
+        Return the live vectorstore, hot-swapping in a newer published version
+        (e.g. one built by another process) when the version on disk changed.
+        If the new version cannot be loaded, the current one keeps serving.
+        """
+        if IntranetRepository._vectorstore is None:
+            return self.create_or_load_faiss_index()
+        version = self.get_index_version()
+        if version is not None and version != IntranetRepository._loaded_version:
+            try:
+                self._load_published_index()
+            except Exception as e:
+                logger.error(f"Error loading index version {version}, keeping current one: {e}")
+        return IntranetRepository._vectorstore
+
+    def build_manifest(self, objects, chunks, ids, loaded):
+        """
+        Map each S3 key to its ETag, size and the ids of its vectors in the index.
+        Keys missing from loaded (reads that failed) get no ETag, so the next sync retries them.
+        """
+        ids_by_source = {}
+        for chunk, chunk_id in zip(chunks, ids):
+            ids_by_source.setdefault(chunk.metadata.get('source'), []).append(chunk_id)
+        return {
+            'bucket': self.bucket_name,
+            'objects': {
+                obj['key']: {
+                    'etag': obj['etag'] if obj['key'] in loaded else None,
+                    'size': obj['size'],
+                    'last_modified': obj['last_modified'],
+                    'ids': ids_by_source.get(obj['key'], []),
+                }
+                for obj in objects
+            },
+        }
+
+    def sync_index(self):
+        """
+        Incrementally synchronise the FAISS index with the S3 bucket.
+
+        Only objects whose ETag or size changed, or that are new, are downloaded
+        and re-chunked; vectors of changed and removed objects are deleted and
+        only the new chunks are embedded and added. Falls back to a full rebuild
+        when there is no index or manifest to start from.
+
+        Returns:
+            dict: Counts of added, updated, removed and unchanged objects and of chunks added/deleted
+        """
+        index_dir = resolve_index_dir(self.index_path)
+        manifest = load_manifest(index_dir)
+        if not manifest or manifest.get('bucket') != self.bucket_name or not index_exists(self.index_path):
+            logger.info("No usable manifest found, performing a full rebuild")
+            if self.force_rebuild_index() is None:
+                raise ValueError("Failed to rebuild FAISS index.")
+            return {'full_rebuild': True}
+
+        # Trabalhar sobre uma cópia; o índice em memória continua servindo até a publicação
+        version = self.get_index_version()
+        vectorstore = load_vectorstore(index_dir, OpenAIEmbeddings(), mutable=True)
+        if not supports_incremental_updates(vectorstore.index):
+            # IVF/HNSW não renumeram linhas ao remover vetores; reconstruir (e re-treinar) o índice
+            logger.info(f"{index_type_of(vectorstore.index)} index cannot be updated incrementally, performing a full rebuild")
+            if self.force_rebuild_index() is None:
+                raise ValueError("Failed to rebuild FAISS index.")
+            return {'full_rebuild': True}
+
+        objects = self.list_document_objects()
+        known = manifest.get('objects', {})
+        current = {obj['key']: obj for obj in objects}
+
+        added = [key for key in current if key not in known]
+        updated = [
+            key for key, obj in current.items()
+            if key in known and (known[key]['etag'] != obj['etag'] or known[key]['size'] != obj['size'])
+        ]
+        removed = [key for key in known if key not in current]
+        summary = {
+            'added': len(added),
+            'updated': len(updated),
+            'removed': len(removed),
+            'unchanged': len(current) - len(added) - len(updated),
+            'chunks_added': 0,
+            'chunks_deleted': 0,
+        }
+        if not (added or updated or removed):
+            logger.info("Index is already in sync with the bucket")
+            return summary
+
+        # Remove vectors of changed and deleted objects
+        existing_ids = set(vectorstore.index_to_docstore_id.values())
+        stale_ids = [
+            chunk_id for key in updated + removed
+            for chunk_id in known[key].get('ids', []) if chunk_id in existing_ids
+        ]
+        if stale_ids:
+            vectorstore.delete(stale_ids)
+            summary['chunks_deleted'] = len(stale_ids)
+
+        chunks, loaded = self.load_documents_from_s3([current[key] for key in added + updated])
+        # Agrupar por fonte: cada arquivo novo ocupa um intervalo contíguo de linhas
+        chunks.sort(key=lambda chunk: chunk.metadata.get('source', ''))
+
+        ids = [str(uuid.uuid4()) for _ in chunks]
+        if chunks:
+            embeddings = CachedEmbeddings(OpenAIEmbeddings(), get_embedding_store())
+            texts = [chunk.page_content for chunk in chunks]
+            vectors = embed_texts_concurrently(texts, embeddings)
+            vectorstore.add_embeddings(
+                list(zip(texts, vectors)),
+                metadatas=[chunk.metadata for chunk in chunks],
+                ids=ids
+            )
+            summary['chunks_added'] = len(chunks)
+
+        new_entries = self.build_manifest(
+            [current[key] for key in added + updated], chunks, ids, loaded
+        )['objects']
+        for key in removed:
+            known.pop(key, None)
+        known.update(new_entries)
+        manifest['objects'] = known
+
+        if self.get_index_version() != version:
+            raise ValueError("Index was republished during sync; run the sync again.")
+        version, new_vectorstore = publish_vectorstore(
+            self.index_path, vectorstore, OpenAIEmbeddings(), manifest=manifest
+        )
+        IntranetRepository._vectorstore = new_vectorstore
+        IntranetRepository._loaded_version = version
+
+        logger.info(f"Incremental sync finished: {summary}")
+        return summary
+
+    def query_document(self, question, k=3, source=None, prefix=None):
+        """
+        Query the FAISS index with a question and return relevant context.
+        source/prefix restrict the search to one document or to a key prefix (e.g. a department folder).
+        """
         if IntranetRepository._vectorstore is None:
             logger.error("FAISS index is not loaded. Trying to load it now.")
-            self.create_or_load_faiss_index()
-            
-            if IntranetRepository._vectorstore is None:
-                raise ValueError("Failed to load FAISS index. Call create_or_load_faiss_index first.")
+        vectorstore = self.get_vectorstore()
+        if vectorstore is None:
+            raise ValueError("Failed to load FAISS index. Call create_or_load_faiss_index first.")
         
-        docs = IntranetRepository._vectorstore.similarity_search(question, k=k)
+        docs = retrieve_documents(question, vectorstore, k=k, source=source, prefix=prefix)
         
         if docs:
             # Format the results to include source information
@@ -302,43 +454,24 @@ class IntranetRepository:
         
         return "No relevant information found."
         
+    def get_index_version(self):
+        """Return the version of the index currently on disk (changes on every rebuild)."""
+        return get_index_version(self.index_path)
+
     def force_rebuild_index(self):
-        """Force rebuild the index from scratch."""
-        # Limpar índice existente
+        """
+        Force rebuild the index from scratch.
 
-        print("*******FORCING******")
-        logger.info(f"Attempting to remove existing index at {self.index_path}")
-        
-        try:
-            # Verificar e remover os arquivos específicos primeiro
-            index_files = [
-                os.path.join(self.index_path, "index.faiss"),
-                os.path.join(self.index_path, "index.pkl")
-            ]
-            
-            for file_path in index_files:
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        logger.info(f"Successfully removed {file_path}")
-                    except Exception as e:
-                        logger.error(f"Error removing {file_path}: {e}")
-            
-            # Verificar se o diretório está vazio e removê-lo se estiver
-            if os.path.exists(self.index_path) and os.path.isdir(self.index_path):
-                if not os.listdir(self.index_path):  # Se estiver vazio
-                    try:
-                        os.rmdir(self.index_path)
-                        logger.info(f"Successfully removed empty directory {self.index_path}")
-                    except Exception as e:
-                        logger.error(f"Error removing directory {self.index_path}: {e}")
-        except Exception as e:
-            logger.error(f"Error during index cleanup: {e}")
-        
-        # Resetar o vectorstore - IMPORTANTE: resetar a variável de classe
-        logger.info("Resetting vector store in memory")
-        IntranetRepository._vectorstore = None
-        
-        # Recriar o índice com force_rebuild=True para garantir nova criação
+        The new index is built into a staging version and published atomically;
+        queries keep using the current index until the new one has loaded cleanly.
+        """
         logger.info("Rebuilding index from scratch")
-        return self.create_or_load_faiss_index(force_rebuild=True)
\ No newline at end of file
+        return self.create_or_load_faiss_index(force_rebuild=True)
+
+    def rollback_index(self):
+        """Publish the previous index version again and swap it in. Returns it, or None."""
+        version = rollback_version(self.index_path)
+        if version is None:
+            logger.warning("No previous index version to roll back to")
+            return None
+        return self._load_published_index()
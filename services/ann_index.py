@@ -0,0 +1,118 @@
+"""
+FAISS index factory for the intranet vectorstore.
+
+INDEX_TYPE selects the index built by create_or_load_faiss_index:
+    flat    exact search (default)
+    ivf     inverted lists over trained k-means centroids, searched with nprobe
+    hnsw    HNSW graph, searched with efSearch
+    ivfpq   IVF with product-quantised vectors (smallest memory, approximate)
+
+All types use L2 distance, like the langchain default. Search parameters are
+applied again whenever an index is loaded, so nprobe/efSearch can be tuned
+through the environment without rebuilding.
+"""
+import os
+import math
+import logging
+import numpy as np
+import faiss
+
+logger = logging.getLogger(__name__)
+
+FLAT = "flat"
+IVF = "ivf"
+HNSW = "hnsw"
+IVFPQ = "ivfpq"
+INDEX_TYPES = (FLAT, IVF, HNSW, IVFPQ)
+
+# k-means needs a reasonable number of points per centroid to train
+MIN_POINTS_PER_CENTROID = 39
+
+
+def configured_index_type():
+    index_type = os.getenv("INDEX_TYPE", FLAT).lower()
+    if index_type not in INDEX_TYPES:
+        logger.error(f"Unknown INDEX_TYPE '{index_type}', using {FLAT}")
+        return FLAT
+    return index_type
+
+
+def index_type_of(index):
+    """Return which INDEX_TYPES entry a FAISS index corresponds to."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return IVFPQ
+    if isinstance(index, faiss.IndexIVF):
+        return IVF
+    if isinstance(index, faiss.IndexHNSW):
+        return HNSW
+    return FLAT
+
+
+def default_nlist(count):
+    """About 4*sqrt(n) lists, capped so that every centroid gets enough training points."""
+    nlist = int(os.getenv("INDEX_IVF_NLIST", "0")) or int(4 * math.sqrt(max(count, 1)))
+    return max(1, min(nlist, count // MIN_POINTS_PER_CENTROID))
+
+
+def default_pq_m(dimension):
+    """Largest subquantizer count <= INDEX_PQ_M that divides the dimension."""
+    m = min(int(os.getenv("INDEX_PQ_M", "64")), dimension)
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def create_index(dimension, index_type=None, training_vectors=None):
+    """
+    Create an empty (trained, when required) FAISS index.
+
+    Args:
+        dimension (int): Vector dimension
+        index_type (str): One of INDEX_TYPES (INDEX_TYPE, default flat)
+        training_vectors: float32 array used to train IVF/PQ
+
+    Returns:
+        faiss.Index: Falls back to a flat index when there are too few vectors to train
+    """
+    index_type = index_type or configured_index_type()
+    count = 0 if training_vectors is None else len(training_vectors)
+
+    if index_type == HNSW:
+        index = faiss.index_factory(dimension, f"HNSW{int(os.getenv('INDEX_HNSW_M', '32'))}")
+        index.hnsw.efConstruction = int(os.getenv("INDEX_HNSW_EF_CONSTRUCTION", "80"))
+    elif index_type in (IVF, IVFPQ):
+        pq_bits = int(os.getenv("INDEX_PQ_NBITS", "8"))
+        min_points = MIN_POINTS_PER_CENTROID * (2 ** pq_bits if index_type == IVFPQ else 2)
+        if count < min_points:
+            logger.warning(f"{count} vectors are too few to train an {index_type} index, using {FLAT}")
+            return faiss.IndexFlatL2(dimension)
+        nlist = default_nlist(count)
+        encoding = "Flat" if index_type == IVF else f"PQ{default_pq_m(dimension)}x{pq_bits}"
+        index = faiss.index_factory(dimension, f"IVF{nlist},{encoding}")
+        index.train(np.ascontiguousarray(training_vectors, dtype=np.float32))
+        logger.info(f"Trained {index_type} index with {nlist} lists on {count} vectors")
+    else:
+        index = faiss.IndexFlatL2(dimension)
+
+    apply_search_params(index)
+    return index
+
+
+def apply_search_params(index):
+    """Set nprobe (INDEX_NPROBE) / efSearch (INDEX_HNSW_EF_SEARCH) on an IVF or HNSW index."""
+    # The downcast proxy does not own the C++ object, so the original is returned
+    typed = faiss.downcast_index(index)
+    if isinstance(typed, faiss.IndexIVF):
+        typed.nprobe = min(int(os.getenv("INDEX_NPROBE", "8")), typed.nlist)
+    elif isinstance(typed, faiss.IndexHNSW):
+        typed.hnsw.efSearch = int(os.getenv("INDEX_HNSW_EF_SEARCH", "64"))
+    return index
+
+
+def supports_incremental_updates(index):
+    """
+    Incremental sync deletes rows and expects the remaining ones to be renumbered,
+    which only the flat index does; the others are rebuilt instead.
+    """
+    return index_type_of(index) == FLAT
@@ -0,0 +1,58 @@
+import os
+import logging
+import multiprocessing
+import concurrent.futures
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+THREAD_MODE = "thread"
+PROCESS_MODE = "process"
+
+# One splitter per worker process, reused across tasks with the same settings.
+_splitters = {}
+
+
+def _get_splitter(chunk_size, chunk_overlap):
+    key = (chunk_size, chunk_overlap)
+    if key not in _splitters:
+        _splitters[key] = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+    return _splitters[key]
+
+
+def split_text_records(source, text, chunk_size, chunk_overlap):
+    """
+    Split a document's text and return a compact record (source, [chunk texts]).
+    Runs in worker processes, so it only exchanges plain strings with the parent.
+    """
+    return source, _get_splitter(chunk_size, chunk_overlap).split_text(text)
+
+
+def records_to_documents(source, texts):
+    """Rebuild Document chunks in the parent process from a compact record."""
+    return [Document(page_content=text, metadata={'source': source}) for text in texts]
+
+
+def default_chunk_workers():
+    return int(os.getenv("CHUNK_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def create_chunk_executor(mode, workers=None):
+    """
+    Return a ProcessPoolExecutor for PROCESS_MODE, or None to split in the calling thread.
+
+    Workers are started by a fork server (spawn where it is unavailable), never
+    forked from the caller: the pool is first used from the S3 reader threads,
+    and a child forked while another thread holds a boto3 or logging lock would
+    deadlock.
+    """
+    if mode != PROCESS_MODE:
+        return None
+    workers = workers or default_chunk_workers()
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    logger.info(f"Chunking with a process pool of {workers} workers ({method})")
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
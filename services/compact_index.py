@@ -0,0 +1,193 @@
+"""
+Compact, memory-mapped on-disk format for the FAISS index.
+
+Next to index.faiss a version directory holds:
+    chunks.bin          UTF-8 chunk texts, concatenated in FAISS row order
+    chunk_offsets.npy   int64 offsets into chunks.bin (n + 1 entries)
+    chunk_ids.npy       fixed-width docstore ids, one per row
+    source_codes.npy    int32 index into sources.json, one per row
+    sources.json        distinct metadata['source'] values
+
+CompactVectorStore opens these lazily with mmap, so loading is constant time
+and pages are only read (and shared between worker processes) when a search
+touches them. Only metadata['source'] is kept, which is all the repositories store.
+
+Convert an existing pickle-based index directory with:
+    python -m services.compact_index faiss_index
+"""
+import os
+import sys
+import json
+import mmap
+import logging
+import threading
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+
+from services.ann_index import apply_search_params
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.bin"
+OFFSETS_FILE = "chunk_offsets.npy"
+IDS_FILE = "chunk_ids.npy"
+SOURCE_CODES_FILE = "source_codes.npy"
+SOURCES_FILE = "sources.json"
+COMPACT_FILES = (CHUNKS_FILE, OFFSETS_FILE, IDS_FILE, SOURCE_CODES_FILE, SOURCES_FILE)
+
+
+def compact_enabled():
+    return os.getenv("INDEX_FORMAT", "compact").lower() == "compact"
+
+
+def has_compact_files(index_dir):
+    return all(os.path.isfile(os.path.join(index_dir, name)) for name in (INDEX_FILE,) + COMPACT_FILES)
+
+
+def save_compact(vectorstore, index_dir):
+    """Write the compact docstore files for a langchain FAISS vectorstore (rows in FAISS order)."""
+    os.makedirs(index_dir, exist_ok=True)
+    if not os.path.isfile(os.path.join(index_dir, INDEX_FILE)):
+        faiss.write_index(vectorstore.index, os.path.join(index_dir, INDEX_FILE))
+
+    ids = [vectorstore.index_to_docstore_id[row] for row in range(vectorstore.index.ntotal)]
+    sources = {}
+    source_codes = np.empty(len(ids), dtype=np.int32)
+    offsets = np.empty(len(ids) + 1, dtype=np.int64)
+    offsets[0] = 0
+
+    with open(os.path.join(index_dir, CHUNKS_FILE), 'wb') as f:
+        for row, doc_id in enumerate(ids):
+            doc = vectorstore.docstore.search(doc_id)
+            data = doc.page_content.encode('utf-8')
+            f.write(data)
+            offsets[row + 1] = offsets[row] + len(data)
+            source = doc.metadata.get('source', 'Unknown')
+            source_codes[row] = sources.setdefault(source, len(sources))
+
+    np.save(os.path.join(index_dir, OFFSETS_FILE), offsets)
+    np.save(os.path.join(index_dir, IDS_FILE), np.array(ids, dtype='S') if ids else np.empty(0, dtype='S1'))
+    np.save(os.path.join(index_dir, SOURCE_CODES_FILE), source_codes)
+    with open(os.path.join(index_dir, SOURCES_FILE), 'w', encoding='utf-8') as f:
+        json.dump(list(sources), f)
+    logger.info(f"Compact index written to {index_dir} ({len(ids)} chunks)")
+
+
+def _read_index_mmap(path):
+    flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | getattr(faiss, 'IO_FLAG_READ_ONLY', 0)
+    try:
+        return faiss.read_index(path, flags)
+    except RuntimeError as e:
+        logger.warning(f"Memory-mapped read not supported for {path} ({e}), reading into RAM")
+        return faiss.read_index(path)
+
+
+class _CompactDocstore:
+    """Minimal docstore interface (search by id) over a CompactVectorStore."""
+
+    def __init__(self, store):
+        self._store = store
+        self._rows_by_id = None
+
+    def search(self, doc_id):
+        if self._rows_by_id is None:
+            self._store._open()
+            self._rows_by_id = {
+                value.decode('utf-8'): row for row, value in enumerate(self._store._ids)
+            }
+        row = self._rows_by_id.get(doc_id)
+        if row is None:
+            return f"ID {doc_id} not found."
+        return self._store.get_document(row)
+
+
+class CompactVectorStore:
+    """
+    Read-only vectorstore over the compact format, exposing the subset of the
+    langchain FAISS API used by the application (similarity_search*, index,
+    embeddings, docstore.search). Files are opened on first use.
+    """
+
+    def __init__(self, index_dir, embedding_function):
+        self.index_dir = index_dir
+        self.embedding_function = embedding_function
+        self.docstore = _CompactDocstore(self)
+        self.lexical_index = None
+        self.partitions = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def _open(self):
+        with self._lock:
+            if self._index is not None:
+                return
+            path = lambda name: os.path.join(self.index_dir, name)
+            self._offsets = np.load(path(OFFSETS_FILE), mmap_mode='r')
+            self._ids = np.load(path(IDS_FILE), mmap_mode='r')
+            self._source_codes = np.load(path(SOURCE_CODES_FILE), mmap_mode='r')
+            with open(path(SOURCES_FILE), 'r', encoding='utf-8') as f:
+                self._sources = json.load(f)
+            with open(path(CHUNKS_FILE), 'rb') as f:
+                self._chunks = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+            self._index = apply_search_params(_read_index_mmap(path(INDEX_FILE)))
+
+    @property
+    def index(self):
+        self._open()
+        return self._index
+
+    def __len__(self):
+        return self.index.ntotal
+
+    def get_document(self, row):
+        self._open()
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return Document(
+            id=self._ids[row].decode('utf-8'),
+            page_content=self._chunks[start:end].decode('utf-8'),
+            metadata={'source': self._sources[int(self._source_codes[row])]}
+        )
+
+    def verify(self):
+        """Open every file and check that they describe the same number of rows."""
+        self._open()
+        rows = self._index.ntotal
+        if not (len(self._offsets) == rows + 1 and len(self._ids) == rows and len(self._source_codes) == rows):
+            raise ValueError(f"Compact index in {self.index_dir} is inconsistent")
+        if rows and int(self._offsets[-1]) != len(self._chunks):
+            raise ValueError(f"Compact chunk blob in {self.index_dir} is truncated")
+        return self
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        query = np.asarray([embedding], dtype=np.float32)
+        scores, rows = self.index.search(query, k)
+        return [
+            (self.get_document(int(row)), float(score))
+            for score, row in zip(scores[0], rows[0]) if row != -1
+        ]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k, **kwargs)
+
+
+def convert_to_compact(index_dir):
+    """Write the compact files for an existing pickle-based index directory."""
+    from langchain_community.vectorstores import FAISS
+    vectorstore = FAISS.load_local(index_dir, None, allow_dangerous_deserialization=True)
+    save_compact(vectorstore, index_dir)
+    CompactVectorStore(index_dir, None).verify()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from services.index_store import resolve_index_dir
+    convert_to_compact(resolve_index_dir(sys.argv[1] if len(sys.argv) > 1 else "faiss_index"))
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from services.query_embedding_cache import embedding_model_name
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement.
+SQLITE_MAX_PARAMS = 900
+
+
+def content_key(text, model_name):
+    """Content address of a chunk: sha256 over the embedding model and the exact text."""
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Persistent key -> float32 vector table backed by SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """Return a dict with the stored vectors for the keys that are present."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), SQLITE_MAX_PARAMS):
+                batch = unique_keys[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items):
+        """Store (key, vector) pairs."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that looks chunk texts up in an EmbeddingStore and only
+    sends the misses to the underlying provider. Query embeddings are delegated.
+    """
+
+    def __init__(self, embeddings, store):
+        self.embeddings = embeddings
+        self.store = store
+        self.model = embedding_model_name(embeddings)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, texts):
+        """
+        Look texts up in the store without calling the provider.
+
+        Returns:
+            tuple: (list with the stored vector or None per text, list of the distinct missing texts)
+        """
+        keys = [content_key(text, self.model) for text in texts]
+        found = self.store.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return [found.get(key) for key in keys], list(missing.values())
+
+    def remember(self, texts, vectors):
+        """Store vectors embedded by the provider for texts."""
+        self.store.put_many([(content_key(text, self.model), vector) for text, vector in zip(texts, vectors)])
+
+    def embed_documents(self, texts):
+        vectors, missing = self.lookup(texts)
+        if missing:
+            new_vectors = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.remember(missing, new_vectors.values())
+            vectors = [new_vectors[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+def get_embedding_store():
+    """Open the store configured by EMBEDDING_STORE_PATH."""
+    return EmbeddingStore(os.getenv("EMBEDDING_STORE_PATH", "embedding_store.db"))
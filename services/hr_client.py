@@ -0,0 +1,254 @@
+"""
+Shared HTTP client for the HR backend (SALARY_ENDPOINT_URL, VACANCY_ENDPOINT_URL, ...).
+
+One keep-alive connection pool per process instead of a new TCP connection per
+call, explicit connect/read timeouts, bounded retries with jittered backoff on
+connection errors and 429/502/503/504, and per-endpoint latency metrics.
+The HR endpoints are read-only lookups, so POST requests are retried too.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class LatencyStats:
+    """Call count, errors and latency percentiles over the most recent calls, per endpoint."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            entry = self._calls.setdefault(endpoint, {'count': 0, 'errors': 0, 'latencies': deque(maxlen=self.window)})
+            entry['count'] += 1
+            entry['errors'] += 0 if ok else 1
+            entry['latencies'].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for endpoint, entry in self._calls.items():
+                latencies = sorted(entry['latencies'])
+                percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+                result[endpoint] = {
+                    'count': entry['count'],
+                    'errors': entry['errors'],
+                    'p50_ms': percentile(0.5),
+                    'p95_ms': percentile(0.95),
+                    'p99_ms': percentile(0.99),
+                    'max_ms': latencies[-1] * 1000,
+                }
+            return result
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl_seconds."""
+
+    def __init__(self, ttl_seconds, max_entries=1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class HRClient:
+    """
+    Pooled sync (requests.Session) and async (httpx.AsyncClient) JSON client.
+
+    Args:
+        connect_timeout (float): Seconds to establish a connection (HR_HTTP_CONNECT_TIMEOUT, default 2)
+        read_timeout (float): Seconds to wait for the response (HR_HTTP_READ_TIMEOUT, default 10)
+        max_retries (int): Retries after the first attempt (HR_HTTP_MAX_RETRIES, default 2)
+        backoff (float): Base backoff in seconds, doubled per retry and jittered (HR_HTTP_BACKOFF, default 0.3)
+        pool_size (int): Keep-alive connections per host (HR_HTTP_POOL_SIZE, default 20)
+        summary_ttl (float): Seconds an /employee/summary answer is reused (EMPLOYEE_SUMMARY_CACHE_TTL, default 60)
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None, backoff=None, pool_size=None,
+                 summary_ttl=None):
+        self.connect_timeout = connect_timeout or float(os.getenv("HR_HTTP_CONNECT_TIMEOUT", "2"))
+        self.read_timeout = read_timeout or float(os.getenv("HR_HTTP_READ_TIMEOUT", "10"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("HR_HTTP_MAX_RETRIES", "2"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("HR_HTTP_BACKOFF", "0.3"))
+        self.pool_size = pool_size or int(os.getenv("HR_HTTP_POOL_SIZE", "20"))
+        self.stats = LatencyStats()
+        self.summary_cache = TTLCache(
+            summary_ttl if summary_ttl is not None else float(os.getenv("EMPLOYEE_SUMMARY_CACHE_TTL", "60"))
+        )
+
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,
+            backoff_factor=self.backoff,
+            backoff_jitter=self.backoff,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Event loop -> (httpx client, task that closes it when the loop shuts down)
+        self._async_clients = {}
+        self._async_lock = threading.Lock()
+
+    def post_json(self, url, payload):
+        """POST payload as JSON and return the decoded response; raises requests.RequestException."""
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.post(url, json=payload, timeout=(self.connect_timeout, self.read_timeout))
+            response.raise_for_status()
+            result = response.json()
+            ok = True
+            return result
+        finally:
+            self.stats.record(url, time.perf_counter() - start, ok)
+
+    def _get_async_client(self):
+        # httpx connection pools belong to the event loop that created them
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                )
+                # Keep a reference to the task: the loop only holds tasks weakly
+                entry = (client, loop.create_task(self._close_with_loop(loop, client)))
+                self._async_clients[loop] = entry
+        return entry[0]
+
+    async def _close_with_loop(self, loop, client):
+        """
+        Wait until the loop shuts down, then close its client. asyncio.run cancels
+        pending tasks on exit, so every asyncio.run releases its connection pool.
+        """
+        try:
+            await asyncio.Event().wait()
+        finally:
+            with self._async_lock:
+                if self._async_clients.get(loop, (None,))[0] is client:
+                    del self._async_clients[loop]
+            await client.aclose()
+
+    def _retry_delay(self, attempt):
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    async def apost_json(self, url, payload):
+        """Async variant of post_json; raises httpx.HTTPError, or json.JSONDecodeError for a body that is not JSON."""
+        client = self._get_async_client()
+        start = time.perf_counter()
+        ok = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await client.post(url, json=payload)
+                except (httpx.ConnectError, httpx.ReadTimeout, httpx.ConnectTimeout, httpx.RemoteProtocolError):
+                    if attempt == self.max_retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                        response.raise_for_status()
+                        result = response.json()
+                        ok = True
+                        return result
+                delay = self._retry_delay(attempt)
+                logger.warning(f"HR backend call to {url} failed, retrying in {delay:.2f}s (attempt {attempt + 1})")
+                await asyncio.sleep(delay)
+        finally:
+            self.stats.record(url, time.perf_counter() - start, ok)
+
+    def employee_summary(self, url, employee_code):
+        """
+        Name, vacation balance and YTD payroll for an employee from the summary
+        endpoint, reused for summary_ttl seconds so one lookup serves both topics.
+        """
+        summary = self.summary_cache.get((url, employee_code))
+        if summary is None:
+            summary = self.post_json(url, {"employeeCode": employee_code})
+            self.summary_cache.put((url, employee_code), summary)
+        return summary
+
+    async def aemployee_summary(self, url, employee_code):
+        """Async variant of employee_summary."""
+        summary = self.summary_cache.get((url, employee_code))
+        if summary is None:
+            summary = await self.apost_json(url, {"employeeCode": employee_code})
+            self.summary_cache.put((url, employee_code), summary)
+        return summary
+
+    def log_stats(self):
+        """Log the latency metrics of every endpoint called so far."""
+        for endpoint, stats in self.stats.snapshot().items():
+            logger.info(
+                f"HR backend {endpoint}: {stats['count']} calls, {stats['errors']} errors, "
+                f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms"
+            )
+
+    def close(self):
+        self.session.close()
+
+    async def aclose(self):
+        """Close the async client of the running event loop."""
+        with self._async_lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            client, closer = entry
+            closer.cancel()
+            await client.aclose()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_hr_client():
+    """Return the process-wide HR client, configured from the environment on first use."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HRClient()
+        return _shared_client
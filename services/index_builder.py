@@ -0,0 +1,185 @@
+import os
+import time
+import random
+import logging
+import threading
+import concurrent.futures
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from services.ann_index import create_index
+from services.embedding_store import CachedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(texts):
+    """Rough token count (~4 characters per token) used for tokens-per-minute budgeting."""
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+def is_rate_limit_error(error):
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429 or 'ratelimit' in type(error).__name__.lower()
+
+
+class RateLimiter:
+    """
+    Token buckets for requests per minute and tokens per minute, plus a shared
+    cooldown that every caller honours after the provider answers 429.
+    A limit of 0 (or None) disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute or 0
+        self.tokens_per_minute = tokens_per_minute or 0
+        self._request_allowance = float(self.requests_per_minute)
+        self._token_allowance = float(self.tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self.requests_per_minute, self._request_allowance + elapsed * self.requests_per_minute / 60
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                self.tokens_per_minute, self._token_allowance + elapsed * self.tokens_per_minute / 60
+            )
+
+    def acquire(self, tokens):
+        # A single batch larger than the whole per-minute budget may still run once the bucket is full.
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._cooldown_until - now
+                if wait <= 0:
+                    request_ok = not self.requests_per_minute or self._request_allowance >= 1
+                    tokens_ok = not self.tokens_per_minute or self._token_allowance >= tokens
+                    if request_ok and tokens_ok:
+                        if self.requests_per_minute:
+                            self._request_allowance -= 1
+                        if self.tokens_per_minute:
+                            self._token_allowance -= tokens
+                        return
+                    wait = 0.05
+                    if not request_ok:
+                        wait = max(wait, (1 - self._request_allowance) * 60 / self.requests_per_minute)
+                    if not tokens_ok:
+                        wait = max(wait, (tokens - self._token_allowance) * 60 / self.tokens_per_minute)
+            time.sleep(wait)
+
+    def cooldown(self, seconds):
+        """Make every caller wait at least `seconds` before the next request."""
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+
+def _embed_batch(embeddings, batch, limiter, max_retries, base_delay):
+    for attempt in range(max_retries + 1):
+        limiter.acquire(estimate_tokens(batch))
+        try:
+            return embeddings.embed_documents(batch)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = base_delay * (2 ** attempt) * (0.5 + random.random())
+            if is_rate_limit_error(e):
+                logger.warning(f"Embedding rate limited, backing off {delay:.1f}s (attempt {attempt + 1})")
+                limiter.cooldown(delay)
+            else:
+                logger.warning(f"Embedding batch failed ({e}), retrying in {delay:.1f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+
+
+def embed_texts_concurrently(texts, embeddings, batch_size=None, max_in_flight=None,
+                             requests_per_minute=None, tokens_per_minute=None,
+                             max_retries=None, base_delay=1.0):
+    """
+    Embed texts in batches with several requests in flight, staying inside the
+    provider's request/token rate limits and backing off on 429 responses.
+    With CachedEmbeddings the store is read first and only the misses are
+    scheduled, so chunks that are already stored use no rate-limit budget.
+
+    Args:
+        texts (list): Texts to embed
+        embeddings: Embeddings object (e.g. CachedEmbeddings)
+        batch_size (int): Texts per request (EMBEDDING_BATCH_SIZE, default 100)
+        max_in_flight (int): Concurrent requests (EMBEDDING_MAX_IN_FLIGHT, default 4)
+        requests_per_minute (int): Request budget (EMBEDDING_RPM, 0 = unlimited)
+        tokens_per_minute (int): Token budget (EMBEDDING_TPM, 0 = unlimited)
+        max_retries (int): Retries per batch (EMBEDDING_MAX_RETRIES, default 6)
+
+    Returns:
+        list: One vector per text, in input order
+    """
+    batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+    max_in_flight = max_in_flight or int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+    requests_per_minute = requests_per_minute if requests_per_minute is not None else int(os.getenv("EMBEDDING_RPM", "0"))
+    tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else int(os.getenv("EMBEDDING_TPM", "0"))
+    max_retries = max_retries if max_retries is not None else int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+
+    if isinstance(embeddings, CachedEmbeddings):
+        vectors, missing = embeddings.lookup(texts)
+        logger.info(f"Embedding store: {sum(vector is not None for vector in vectors)} of {len(texts)} texts cached")
+        if missing:
+            new_vectors = embed_texts_concurrently(
+                missing, embeddings.embeddings, batch_size, max_in_flight,
+                requests_per_minute, tokens_per_minute, max_retries, base_delay
+            )
+            embeddings.remember(missing, new_vectors)
+            new_vectors = dict(zip(missing, new_vectors))
+            vectors = [new_vectors[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return []
+    logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches, {max_in_flight} in flight")
+
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    results = [None] * len(batches)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = {
+            executor.submit(_embed_batch, embeddings, batch, limiter, max_retries, base_delay): position
+            for position, batch in enumerate(batches)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            results[futures[future]] = future.result()
+
+    return [vector for batch_vectors in results for vector in batch_vectors]
+
+
+def build_faiss_index(chunks, embeddings, ids=None, index_type=None):
+    """
+    Embed all chunks through the concurrent scheduler and build the FAISS index
+    with a single bulk add. The index type (flat, IVF, HNSW, IVF-PQ) comes from
+    INDEX_TYPE unless given; IVF variants are trained on the chunk vectors.
+    Chunks are added sorted by source, so every source (and source prefix)
+    occupies one contiguous range of rows for filtered searches.
+    """
+    if not chunks:
+        raise ValueError("Cannot build a FAISS index without chunks.")
+    order = sorted(range(len(chunks)), key=lambda position: chunks[position].metadata.get('source', ''))
+    chunks = [chunks[position] for position in order]
+    if ids is not None:
+        ids = [ids[position] for position in order]
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = embed_texts_concurrently(texts, embeddings)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    index = create_index(matrix.shape[1], index_type, training_vectors=matrix)
+    vectorstore = FAISS(embeddings, index, InMemoryDocstore(), {})
+    vectorstore.add_embeddings(
+        list(zip(texts, vectors)),
+        metadatas=[chunk.metadata for chunk in chunks],
+        ids=ids
+    )
+    return vectorstore
@@ -0,0 +1,205 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import datetime
+from langchain_community.vectorstores import FAISS
+from services.ann_index import apply_search_params
+from services.lexical_index import build_lexical_index, load_lexical_index
+from services.partitions import build_partitions, load_partitions, save_partitions
+from services.compact_index import CompactVectorStore, compact_enabled, has_compact_files, save_compact
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILES = ("index.faiss", "index.pkl")
+MANIFEST_FILE = "manifest.json"
+
+# Versioned layout:
+#   <index_path>/CURRENT              -> name of the published version
+#   <index_path>/versions/<version>/  -> index.faiss, index.pkl, manifest.json, compact and lexical files
+#   <index_path>/versions/.staging-*  -> builds in progress
+# An index_path without CURRENT is read in the legacy flat layout.
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+STAGING_PREFIX = ".staging-"
+KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+
+
+def get_current_version(index_path):
+    """Return the name of the published version, or None for the legacy layout."""
+    try:
+        with open(os.path.join(index_path, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    return version or None
+
+
+def resolve_index_dir(index_path):
+    """Return the directory holding the index files that are currently published."""
+    version = get_current_version(index_path)
+    if version:
+        version_dir = os.path.join(index_path, VERSIONS_DIR, version)
+        if os.path.isdir(version_dir):
+            return version_dir
+        logger.error(f"Published index version {version} not found, using legacy layout")
+    return index_path
+
+
+def index_exists(index_path):
+    return os.path.isfile(os.path.join(resolve_index_dir(index_path), INDEX_FILES[0]))
+
+
+def get_index_version(index_path):
+    """
+    Return a string identifying the FAISS index currently published at index_path,
+    or None if there is no index on disk.
+
+    The version changes on every publish (or, in the legacy layout, whenever the
+    index files are rewritten), so caches keyed on it are invalidated by any
+    rebuild, whichever process performed it.
+    """
+    version = get_current_version(index_path)
+    if version:
+        return version
+    try:
+        stat = os.stat(os.path.join(index_path, INDEX_FILES[0]))
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def list_versions(index_path):
+    """Published (complete) versions, oldest first."""
+    versions_dir = os.path.join(index_path, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(versions_dir)
+        if not name.startswith(STAGING_PREFIX) and os.path.isdir(os.path.join(versions_dir, name))
+    )
+
+
+def create_staging_dir(index_path):
+    """Create an empty staging directory for a new build and return (version, path)."""
+    version = f"v{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+    staging_dir = os.path.join(index_path, VERSIONS_DIR, f"{STAGING_PREFIX}{version}")
+    os.makedirs(staging_dir)
+    return version, staging_dir
+
+
+def _write_current(index_path, version):
+    path = os.path.join(index_path, CURRENT_FILE)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def publish_version(index_path, version, staging_dir):
+    """
+    Move a finished staging build into place and atomically point CURRENT at it.
+    Older versions beyond KEEP_VERSIONS are removed; the previous one is kept for rollback.
+    """
+    version_dir = os.path.join(index_path, VERSIONS_DIR, version)
+    os.replace(staging_dir, version_dir)
+    _write_current(index_path, version)
+    logger.info(f"Published index version {version}")
+
+    for old_version in list_versions(index_path)[:-KEEP_VERSIONS] if KEEP_VERSIONS > 0 else []:
+        if old_version != version:
+            shutil.rmtree(os.path.join(index_path, VERSIONS_DIR, old_version), ignore_errors=True)
+            logger.info(f"Removed old index version {old_version}")
+    return version_dir
+
+
+def rollback_version(index_path):
+    """Point CURRENT at the version published before the current one. Returns it, or None."""
+    versions = list_versions(index_path)
+    current = get_current_version(index_path)
+    if current not in versions:
+        return None
+    position = versions.index(current)
+    if position == 0:
+        return None
+    previous = versions[position - 1]
+    _write_current(index_path, previous)
+    logger.info(f"Rolled back index from {current} to {previous}")
+    return previous
+
+
+def load_vectorstore(index_dir, embeddings, mutable=False):
+    """
+    Load the index in index_dir. Unless a mutable (langchain FAISS) store is
+    requested, the lazily memory-mapped compact format is used when present.
+    The BM25 index and source partitions of the same version, if any, are
+    attached as lexical_index and partitions.
+    """
+    if not mutable and compact_enabled() and has_compact_files(index_dir):
+        vectorstore = CompactVectorStore(index_dir, embeddings)
+    else:
+        vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+        apply_search_params(vectorstore.index)
+    vectorstore.lexical_index = load_lexical_index(index_dir)
+    vectorstore.partitions = load_partitions(index_dir)
+    return vectorstore
+
+
+def publish_vectorstore(index_path, vectorstore, embeddings, manifest=None):
+    """
+    Save a vectorstore as a new version, verify that it loads, then publish it.
+
+    The live index is untouched until the new one has been written and loaded
+    cleanly; a failed build leaves the previously published version in place.
+
+    Returns:
+        tuple: (version, vectorstore loaded from the published files)
+    """
+    version, staging_dir = create_staging_dir(index_path)
+    try:
+        # index.pkl is kept for incremental syncs, which need a mutable store
+        vectorstore.save_local(staging_dir)
+        build_lexical_index(vectorstore, staging_dir)
+        save_partitions(staging_dir, build_partitions(vectorstore))
+        if compact_enabled():
+            save_compact(vectorstore, staging_dir)
+            CompactVectorStore(staging_dir, embeddings).verify()
+        else:
+            loaded = load_vectorstore(staging_dir, embeddings)
+        if manifest is not None:
+            save_manifest(staging_dir, manifest)
+        version_dir = publish_version(index_path, version, staging_dir)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    if compact_enabled():
+        loaded = CompactVectorStore(version_dir, embeddings)
+    loaded.lexical_index = load_lexical_index(version_dir)
+    loaded.partitions = load_partitions(version_dir)
+    return version, loaded
+
+
+def load_manifest(index_dir):
+    """Load the sync manifest stored next to the index, or None if missing or unreadable."""
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading manifest {path}: {e}")
+        return None
+
+
+def save_manifest(index_dir, manifest):
+    """Write the sync manifest atomically (temp file + rename)."""
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, path)
@@ -0,0 +1,111 @@
+import os
+import json
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingIntentClassifier:
+    """
+    Nearest-centroid intent classifier over query embeddings.
+
+    Centroids are the L2-normalised mean embedding of each request type, so a
+    prediction is one matrix-vector product against a handful of rows.
+    Confidence is the softmax of the cosine similarities, scaled by temperature.
+    """
+
+    def __init__(self, labels=None, centroids=None, temperature=0.05, embedding_model=None):
+        self.labels = list(labels) if labels is not None else []
+        self.centroids = centroids
+        self.temperature = temperature
+        self.embedding_model = embedding_model
+
+    @staticmethod
+    def _normalize(matrix):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def fit(self, vectors, labels):
+        """Compute one centroid per label from the training embeddings."""
+        vectors = self._normalize(vectors)
+        labels = np.asarray(labels)
+        self.labels = sorted(set(labels.tolist()))
+        self.centroids = self._normalize(
+            np.stack([vectors[labels == label].mean(axis=0) for label in self.labels])
+        )
+        return self
+
+    def predict_proba(self, vectors):
+        similarities = self._normalize(np.atleast_2d(vectors)) @ self.centroids.T
+        logits = similarities / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, vector):
+        """
+        Predict the request type of a single embedding.
+
+        Returns:
+            tuple: (request_type, confidence)
+        """
+        probabilities = self.predict_proba(vector)[0]
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            centroids=self.centroids,
+            labels=np.asarray(self.labels),
+            meta=np.asarray(json.dumps({
+                'temperature': self.temperature,
+                'embedding_model': self.embedding_model,
+            })),
+        )
+        logger.info(f"Intent classifier saved to {path}")
+
+    @classmethod
+    def load(cls, path, embedding_model=None):
+        """
+        Load a saved classifier. With embedding_model, refuse (ValueError) a
+        model trained on another embedding model, whose centroids would not be
+        comparable with the query embeddings.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if embedding_model is not None and meta.get('embedding_model') != embedding_model:
+                raise ValueError(
+                    f"{path} was trained on embedding model {meta.get('embedding_model')!r}, "
+                    f"queries use {embedding_model!r}; retrain it with train_intent_classifier.py"
+                )
+            return cls(
+                labels=data['labels'].tolist(),
+                centroids=data['centroids'].astype(np.float32),
+                temperature=meta.get('temperature', 0.05),
+                embedding_model=meta.get('embedding_model'),
+            )
+
+
+def load_classification_log(path, tiers=("llm",)):
+    """
+    Read logged classifier decisions (JSON lines) as (question, request_type) pairs.
+    Only decisions made by the given tiers are used as labels; duplicates are dropped.
+    """
+    samples = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if tiers and record.get('tier') not in tiers:
+                continue
+            question = record.get('question')
+            request_type = record.get('request_type')
+            if question and request_type:
+                samples[question] = request_type
+    return list(samples.items())
@@ -0,0 +1,121 @@
+import re
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SALARY_REQUEST = "salary_request"
+VACANCY_REQUEST = "vacancy_request"
+GLOBAL_QUESTION = "global_question"
+
+# Phrases like "my code is abc123", "employee ID: 12345", "meu código é ABC123".
+# The captured value must contain at least one digit so that sentences such as
+# "my code is broken" are not mistaken for an employee code.
+EMPLOYEE_CODE_PATTERN = re.compile(
+    r"\b(?:employee\s*)?(?:code|id|number|n[uú]mero|c[oó]digo|matr[ií]cula)\b"
+    r"\s*(?:is|=|:|é)?\s*#?\s*"
+    r"\b([A-Za-z]*\d[A-Za-z0-9-]*)\b",
+    re.IGNORECASE,
+)
+
+SALARY_KEYWORDS = (
+    "salary", "payroll", "paycheck", "ytd", "earnings", "wage", "my pay",
+    "salário", "salario", "pagamento", "holerite", "remuneração", "remuneracao",
+)
+
+VACANCY_KEYWORDS = (
+    "vacation", "vacancy", "leave balance", "time off", "days off", " pto ",
+    "holiday balance", "férias", "ferias",
+)
+
+# Words that hint at a personal HR lookup even without a topic keyword.
+PERSONAL_HINTS = ("my ", " me ", "i have", "do i", "meu ", "minha ", "eu tenho")
+
+MIN_GLOBAL_WORDS = 4
+
+
+@dataclass
+class RuleDecision:
+    request_type: Optional[str]
+    employee_code: Optional[str]
+    confidence: float
+    # An earlier user message was an HR lookup, so this turn may be a follow-up of it
+    after_hr_turn: bool = False
+
+
+def extract_employee_code(text):
+    """Return the employee code mentioned in the text, or None."""
+    match = EMPLOYEE_CODE_PATTERN.search(text or "")
+    return match.group(1) if match else None
+
+
+def _mentions(text, keywords):
+    return any(keyword in text for keyword in keywords)
+
+
+def _has_hr_turn(history):
+    """True when an earlier user message asked for salary or vacancy data or gave an employee code."""
+    for previous in history:
+        lowered = f" {(previous or '').lower()} "
+        if (_mentions(lowered, SALARY_KEYWORDS) or _mentions(lowered, VACANCY_KEYWORDS)
+                or extract_employee_code(previous)):
+            return True
+    return False
+
+
+def classify_text(text, history=()):
+    """
+    Classify a user question with keyword and pattern rules.
+
+    Args:
+        text (str): The last user message
+        history (iterable): Previous user messages, newest first, used to
+            recover an employee code given earlier in the conversation and to
+            tell follow-ups of an HR lookup from standalone questions
+
+    Returns:
+        RuleDecision: Request type, employee code and a confidence in [0, 1].
+            request_type is None when the rules cannot decide.
+    """
+    history = list(history)
+    after_hr_turn = _has_hr_turn(history)
+    decision = _classify_text(text, history, after_hr_turn)
+    decision.after_hr_turn = after_hr_turn
+    return decision
+
+
+def _classify_text(text, history, after_hr_turn):
+    lowered = f" {(text or '').lower()} "
+    employee_code = extract_employee_code(text)
+    code_from_history = None
+    if not employee_code:
+        for previous in history:
+            code_from_history = extract_employee_code(previous)
+            if code_from_history:
+                break
+
+    is_salary = _mentions(lowered, SALARY_KEYWORDS)
+    is_vacancy = _mentions(lowered, VACANCY_KEYWORDS)
+
+    if is_salary and is_vacancy:
+        return RuleDecision(None, employee_code or code_from_history, 0.0)
+
+    if is_salary or is_vacancy:
+        request_type = SALARY_REQUEST if is_salary else VACANCY_REQUEST
+        if employee_code:
+            return RuleDecision(request_type, employee_code, 0.95)
+        if code_from_history:
+            return RuleDecision(request_type, code_from_history, 0.85)
+        # The HR responders need a code; let the LLM handle this turn.
+        return RuleDecision(request_type, None, 0.3)
+
+    if employee_code or _mentions(lowered, PERSONAL_HINTS):
+        return RuleDecision(None, employee_code or code_from_history, 0.0)
+
+    if len(lowered.split()) >= MIN_GLOBAL_WORDS and not after_hr_turn:
+        return RuleDecision(GLOBAL_QUESTION, None, 0.85)
+
+    # Short follow-ups ("and the other one?") and any question after an HR
+    # lookup ("what about my colleague's balance?") depend on history.
+    return RuleDecision(GLOBAL_QUESTION, None, 0.4)
@@ -0,0 +1,162 @@
+"""
+BM25 inverted index over the chunks of a published FAISS index.
+
+It is built from the same vectorstore at publish time and stored in the
+version directory next to index.faiss:
+    lexical_postings.npy      int32 chunk rows, grouped by term
+    lexical_tf.npy            float32 term frequency for each posting
+    lexical_term_offsets.npy  int64 start of each term's postings (n_terms + 1 entries)
+    lexical_doc_lengths.npy   float32 token count of each chunk
+    lexical_meta.json         vocabulary (term -> term number)
+
+The posting arrays are memory-mapped on first search. Hits are FAISS row
+numbers, resolved to documents by row like any other search of the store.
+"""
+import os
+import re
+import json
+import math
+import logging
+import threading
+import unicodedata
+from collections import Counter
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+POSTINGS_FILE = "lexical_postings.npy"
+TF_FILE = "lexical_tf.npy"
+TERM_OFFSETS_FILE = "lexical_term_offsets.npy"
+DOC_LENGTHS_FILE = "lexical_doc_lengths.npy"
+META_FILE = "lexical_meta.json"
+LEXICAL_FILES = (POSTINGS_FILE, TF_FILE, TERM_OFFSETS_FILE, DOC_LENGTHS_FILE, META_FILE)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de do da dos das no na nos nas em por para com sem "
+    "e ou que qual quais como quando onde se ao aos à às é são ser foi "
+    "meu minha meus minhas seu sua seus suas eu voce você ele ela nos nós eles elas "
+    "the an of to in on for and or is are be what which how when where do does i my you your"
+    .split()
+)
+
+
+def tokenize(text):
+    """Lowercase, strip accents and split into alphanumeric terms, dropping stopwords."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+def has_lexical_files(index_dir):
+    return all(os.path.isfile(os.path.join(index_dir, name)) for name in LEXICAL_FILES)
+
+
+def build_lexical_index(vectorstore, index_dir):
+    """Build and save the BM25 index for a langchain FAISS vectorstore (rows in FAISS order)."""
+    count = vectorstore.index.ntotal
+    postings = {}
+    doc_lengths = np.zeros(count, dtype=np.float32)
+
+    for row in range(count):
+        tokens = tokenize(vectorstore.docstore.search(vectorstore.index_to_docstore_id[row]).page_content)
+        doc_lengths[row] = len(tokens)
+        for term, count in Counter(tokens).items():
+            postings.setdefault(term, []).append((row, count))
+
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    for position, term in enumerate(terms):
+        offsets[position + 1] = offsets[position] + len(postings[term])
+    rows = np.empty(int(offsets[-1]), dtype=np.int32)
+    tfs = np.empty(int(offsets[-1]), dtype=np.float32)
+    for position, term in enumerate(terms):
+        entries = np.asarray(postings[term], dtype=np.int64)
+        rows[offsets[position]:offsets[position + 1]] = entries[:, 0]
+        tfs[offsets[position]:offsets[position + 1]] = entries[:, 1]
+
+    np.save(os.path.join(index_dir, POSTINGS_FILE), rows)
+    np.save(os.path.join(index_dir, TF_FILE), tfs)
+    np.save(os.path.join(index_dir, TERM_OFFSETS_FILE), offsets)
+    np.save(os.path.join(index_dir, DOC_LENGTHS_FILE), doc_lengths)
+    with open(os.path.join(index_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'terms': {term: position for position, term in enumerate(terms)}}, f)
+    logger.info(f"Lexical index written to {index_dir} ({len(terms)} terms, {count} chunks)")
+
+
+class LexicalIndex:
+    """Read-only BM25 index stored in an index version directory, opened on first search."""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self._terms = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        with self._lock:
+            if self._terms is not None:
+                return
+            path = lambda name: os.path.join(self.index_dir, name)
+            self._postings = np.load(path(POSTINGS_FILE), mmap_mode='r')
+            self._tfs = np.load(path(TF_FILE), mmap_mode='r')
+            self._offsets = np.load(path(TERM_OFFSETS_FILE), mmap_mode='r')
+            self._doc_lengths = np.load(path(DOC_LENGTHS_FILE))
+            self._avg_length = float(self._doc_lengths.mean()) if len(self._doc_lengths) else 0.0
+            with open(path(META_FILE), 'r', encoding='utf-8') as f:
+                self._terms = json.load(f)['terms']
+
+    def _idf(self, document_frequency):
+        count = len(self._doc_lengths)
+        return math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query, k=3, ranges=None):
+        """
+        Score chunks for the query with BM25, optionally only those in the
+        given [start, end) row ranges.
+
+        Alongside the score, each hit carries the idf weight of the query terms
+        it contains. Divided by the query weight (the idf of every query term,
+        including terms missing from the corpus) this is the share of the query
+        the chunk matches, which does not depend on chunk length or term counts.
+
+        Returns:
+            tuple: ([(row, score, matched weight)] best first, query weight)
+        """
+        self._open()
+        scores = np.zeros(len(self._doc_lengths), dtype=np.float32)
+        matched = np.zeros(len(self._doc_lengths), dtype=np.float32)
+        query_weight = 0.0
+        for term in set(tokenize(query)):
+            position = self._terms.get(term)
+            if position is None:
+                query_weight += self._idf(0)
+                continue
+            start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+            rows = self._postings[start:end]
+            tfs = self._tfs[start:end]
+            idf = self._idf(end - start)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[rows] / self._avg_length)
+            scores[rows] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+            matched[rows] += idf
+            query_weight += idf
+
+        if ranges is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            for start, end in ranges:
+                allowed[start:end] = True
+            scores[~allowed] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        ranked = sorted(candidates, key=lambda row: -scores[row])
+        return [(int(row), float(scores[row]), float(matched[row])) for row in ranked], query_weight
+
+
+def load_lexical_index(index_dir):
+    """Return the LexicalIndex stored in index_dir, or None for indexes built without one."""
+    if not has_lexical_files(index_dir):
+        return None
+    return LexicalIndex(index_dir)
@@ -0,0 +1,127 @@
+"""
+Source partitions of a FAISS index, for searches restricted to some documents.
+
+partitions.json maps each metadata['source'] to the FAISS row ranges
+[start, end) holding its chunks. Full builds add chunks sorted by source, so
+a source, and any key prefix such as an S3 "folder", is one contiguous range
+and the search runs over it with an IDSelectorRange. Rows appended by
+incremental syncs add further ranges, which are searched with an IDSelectorBatch.
+"""
+import os
+import json
+import bisect
+import logging
+import numpy as np
+import faiss
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_FILE = "partitions.json"
+
+
+def document_for_row(vectorstore, row):
+    """Return the Document stored at a FAISS row of a langchain FAISS or compact store."""
+    if hasattr(vectorstore, 'get_document'):
+        return vectorstore.get_document(row)
+    doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[row])
+    return None if isinstance(doc, str) else doc
+
+
+def build_partitions(vectorstore):
+    """Return {source: [[start, end], ...]} for the rows of a vectorstore."""
+    partitions = {}
+    for row in range(vectorstore.index.ntotal):
+        doc = document_for_row(vectorstore, row)
+        source = doc.metadata.get('source', 'Unknown') if doc is not None else 'Unknown'
+        ranges = partitions.setdefault(source, [])
+        if ranges and ranges[-1][1] == row:
+            ranges[-1][1] = row + 1
+        else:
+            ranges.append([row, row + 1])
+    return partitions
+
+
+def save_partitions(index_dir, partitions):
+    with open(os.path.join(index_dir, PARTITIONS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(partitions, f)
+
+
+class PartitionMap:
+    """Row ranges by source, with lookups by exact source or by source prefix."""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.sources = sorted(partitions)
+
+    def ranges_for(self, source=None, prefix=None):
+        """Merged, sorted [start, end) ranges of the matching sources."""
+        if source is not None:
+            matched = [source] if source in self.partitions else []
+        else:
+            start = bisect.bisect_left(self.sources, prefix)
+            end = start
+            while end < len(self.sources) and self.sources[end].startswith(prefix):
+                end += 1
+            matched = self.sources[start:end]
+
+        merged = []
+        for start, end in sorted(r for name in matched for r in self.partitions[name]):
+            if merged and merged[-1][1] >= start:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+
+def load_partitions(index_dir):
+    """Return the PartitionMap stored in index_dir, or None for indexes built without one."""
+    path = os.path.join(index_dir, PARTITIONS_FILE)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return PartitionMap(json.load(f))
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading partitions {path}: {e}")
+        return None
+
+
+def get_partition_map(vectorstore):
+    """The vectorstore's partition map, derived from its rows when none was stored."""
+    if getattr(vectorstore, 'partitions', None) is None:
+        logger.info("No stored partitions for this index, building them from the docstore")
+        vectorstore.partitions = PartitionMap(build_partitions(vectorstore))
+    return vectorstore.partitions
+
+
+def make_selector(ranges):
+    if len(ranges) == 1:
+        return faiss.IDSelectorRange(ranges[0][0], ranges[0][1])
+    return faiss.IDSelectorBatch(np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in ranges]))
+
+
+def make_search_params(index, selector, selected_rows):
+    """
+    SearchParameters that restrict the search to the selector, keeping the
+    index's own nprobe/efSearch. IVF probes more lists for small partitions, in
+    proportion to the share of rows they hold, so that enough candidates are scanned.
+    """
+    typed = faiss.downcast_index(index)
+    if isinstance(typed, faiss.IndexIVF):
+        share = max(selected_rows, 1) / max(typed.ntotal, 1)
+        return faiss.SearchParametersIVF(sel=selector, nprobe=min(typed.nlist, int(np.ceil(typed.nprobe / share))))
+    if isinstance(typed, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=typed.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def filtered_similarity_search(vectorstore, embedding, ranges, k=4):
+    """Search only the given row ranges and return the matching Documents, best first."""
+    if not ranges:
+        return []
+    selector = make_selector(ranges)
+    params = make_search_params(vectorstore.index, selector, sum(end - start for start, end in ranges))
+    query = np.asarray([embedding], dtype=np.float32)
+    _, rows = vectorstore.index.search(query, k, params=params)
+    documents = [document_for_row(vectorstore, int(row)) for row in rows[0] if row != -1]
+    return [doc for doc in documents if doc is not None]
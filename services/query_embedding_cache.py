@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text):
+    """Collapse whitespace and case so trivially different questions share an entry."""
+    return " ".join((text or "").split()).casefold()
+
+
+def embedding_model_name(embeddings):
+    return getattr(embeddings, 'model', None) or getattr(embeddings, 'model_name', None) or type(embeddings).__name__
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed on (embedding model, normalised text).
+
+    When `persist_path` is set, entries are also written to a SQLite file and read
+    back on a memory miss, so the cache survives restarts and is shared between
+    processes on the same host.
+    """
+
+    def __init__(self, max_entries=2048, persist_path=None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if persist_path:
+            os.makedirs(os.path.dirname(persist_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(persist_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._conn.commit()
+
+    def _read_persisted(self, key):
+        row = self._conn.execute(
+            "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32).tolist() if row else None
+
+    def _write_persisted(self, key, vector):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO query_embeddings (key, vector) VALUES (?, ?)",
+            (key, np.asarray(vector, dtype=np.float32).tobytes())
+        )
+        self._conn.commit()
+
+    def _remember(self, key, vector):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _key(self, text, embeddings):
+        return f"{embedding_model_name(embeddings)}\x00{normalize_query(text)}"
+
+    def _lookup(self, key):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None and self._conn is not None:
+                vector = self._read_persisted(key)
+                if vector is not None:
+                    self._remember(key, vector)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+            return None
+
+    def _store(self, key, vector):
+        with self._lock:
+            self._remember(key, vector)
+            if self._conn is not None:
+                try:
+                    self._write_persisted(key, vector)
+                except sqlite3.Error as e:
+                    logger.error(f"Error persisting query embedding: {e}")
+
+    def peek(self, text, embeddings):
+        """The cached embedding of `text`, or None; never calls the provider."""
+        key = self._key(text, embeddings)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None and self._conn is not None:
+                vector = self._read_persisted(key)
+            return vector
+
+    def embed_query(self, text, embeddings):
+        """
+        Return the embedding of `text` using `embeddings`, calling the provider
+        only when neither the memory cache nor the persisted cache has it.
+        """
+        key = self._key(text, embeddings)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = embeddings.embed_query(text)
+            self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text, embeddings):
+        """Async variant of embed_query; a miss awaits embeddings.aembed_query."""
+        key = self._key(text, embeddings)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = await embeddings.aembed_query(text)
+            self._store(key, vector)
+        return vector
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache():
+    """Return the process-wide cache, configured from the environment on first use."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryEmbeddingCache(
+                max_entries=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048")),
+                persist_path=os.getenv("QUERY_EMBEDDING_CACHE_PATH") or None,
+            )
+        return _shared_cache
@@ -0,0 +1,165 @@
+"""
+Chunk retrieval for the global responder and the repositories.
+
+RETRIEVAL_MODE:
+    vector   FAISS similarity search only
+    hybrid   FAISS and BM25 candidates merged with reciprocal rank fusion (default)
+
+With LEXICAL_FAST_PATH enabled, a query whose BM25 hits are decisive is
+answered from them alone, without embedding the question.
+"""
+import os
+import asyncio
+import logging
+
+from services.query_embedding_cache import get_query_embedding_cache
+from services.partitions import document_for_row, filtered_similarity_search, get_partition_map
+
+logger = logging.getLogger(__name__)
+
+VECTOR_MODE = "vector"
+HYBRID_MODE = "hybrid"
+
+# Standard RRF damping constant
+RRF_K = 60
+
+
+def _flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _documents_by_row(vectorstore, hits):
+    """
+    Fetch the documents for (row, score, matched weight) hits by FAISS row, as
+    (document, score, matched weight) tuples. A compact store reads each row
+    directly, without building a docstore id map.
+    """
+    documents = []
+    for row, score, matched in hits:
+        doc = document_for_row(vectorstore, row)
+        if doc is not None:
+            documents.append((doc, score, matched))
+    return documents
+
+
+def is_decisive(scored_docs, query_weight):
+    """
+    Lexical hits are decisive when the best chunk contains a large, idf-weighted
+    share of the query terms (LEXICAL_FAST_PATH_MIN_COVERAGE) and its score
+    clearly beats the next best chunk (LEXICAL_FAST_PATH_MARGIN), whatever its
+    source, so single-source indexes and filtered searches are held to the same bar.
+    """
+    if not scored_docs or query_weight <= 0:
+        return False
+    _, top_score, top_matched = scored_docs[0]
+    if top_matched / query_weight < float(os.getenv("LEXICAL_FAST_PATH_MIN_COVERAGE", "0.6")):
+        return False
+    runner_up = scored_docs[1][1] if len(scored_docs) > 1 else 0.0
+    return top_score >= float(os.getenv("LEXICAL_FAST_PATH_MARGIN", "1.5")) * runner_up
+
+
+def _document_key(doc):
+    return doc.metadata.get('source'), doc.page_content
+
+
+def reciprocal_rank_fusion(*rankings, k=RRF_K):
+    """Merge ranked document lists; each document scores sum(1 / (k + rank))."""
+    scores = {}
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _document_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def _search_plan(vectorstore, k, source, prefix):
+    """Resolve the retrieval settings and the row ranges of the source/prefix filter."""
+    lexical_index = getattr(vectorstore, 'lexical_index', None)
+    mode = os.getenv("RETRIEVAL_MODE", HYBRID_MODE).lower()
+    candidates = max(k, int(os.getenv("HYBRID_CANDIDATES", "20")))
+    ranges = None
+    if source is not None or prefix is not None:
+        ranges = get_partition_map(vectorstore).ranges_for(source=source, prefix=prefix)
+    return lexical_index, mode, candidates, ranges
+
+
+def _vector_search(vectorstore, embedding, count, ranges):
+    if ranges is None:
+        return vectorstore.similarity_search_by_vector(embedding, k=count)
+    return filtered_similarity_search(vectorstore, embedding, ranges, k=count)
+
+
+def _lexical_candidates(question, vectorstore, lexical_index, mode, candidates, ranges):
+    """BM25 candidates as (document, score, matched weight) tuples, and whether they are decisive on their own."""
+    if lexical_index is None or not (mode == HYBRID_MODE or _flag("LEXICAL_FAST_PATH", "true")):
+        return [], False
+    hits, query_weight = lexical_index.search(question, candidates, ranges=ranges)
+    lexical_docs = _documents_by_row(vectorstore, hits)
+    return lexical_docs, _flag("LEXICAL_FAST_PATH", "true") and is_decisive(lexical_docs, query_weight)
+
+
+def lexical_fast_path(question, vectorstore, k=3, source=None, prefix=None):
+    """
+    The k chunks for the question when its BM25 hits are decisive, else None.
+    Needs no embedding, so callers can decide before embedding the question.
+    """
+    lexical_index, mode, candidates, ranges = _search_plan(vectorstore, k, source, prefix)
+    if lexical_index is None or ranges == []:
+        return None
+    lexical_docs, decisive = _lexical_candidates(question, vectorstore, lexical_index, mode, candidates, ranges)
+    return [doc for doc, _, _ in lexical_docs[:k]] if decisive else None
+
+
+def retrieve_documents(question, vectorstore, k=3, source=None, prefix=None):
+    """
+    Return the k chunks most relevant to the question.
+
+    Args:
+        question (str): The query string
+        vectorstore: FAISS or CompactVectorStore; its lexical_index attribute, if any, is used
+        k (int): Number of chunks to return
+        source (str): Only search chunks of this exact source
+        prefix (str): Only search chunks whose source starts with this prefix (e.g. an S3 folder)
+
+    Returns:
+        list: Documents, best first
+    """
+    lexical_index, mode, candidates, ranges = _search_plan(vectorstore, k, source, prefix)
+    if ranges == []:
+        return []
+
+    lexical_docs, decisive = _lexical_candidates(question, vectorstore, lexical_index, mode, candidates, ranges)
+    if decisive:
+        logger.debug("Answering retrieval from the lexical index")
+        return [doc for doc, _, _ in lexical_docs[:k]]
+
+    embedding = get_query_embedding_cache().embed_query(question, vectorstore.embeddings)
+    if mode != HYBRID_MODE or not lexical_docs:
+        return _vector_search(vectorstore, embedding, k, ranges)
+
+    vector_docs = _vector_search(vectorstore, embedding, candidates, ranges)
+    return reciprocal_rank_fusion(vector_docs, [doc for doc, _, _ in lexical_docs])[:k]
+
+
+async def aretrieve_documents(question, vectorstore, k=3, source=None, prefix=None):
+    """
+    Async variant of retrieve_documents: the question is embedded with the
+    provider's async client and the FAISS search runs in a worker thread.
+    """
+    lexical_index, mode, candidates, ranges = _search_plan(vectorstore, k, source, prefix)
+    if ranges == []:
+        return []
+
+    lexical_docs, decisive = _lexical_candidates(question, vectorstore, lexical_index, mode, candidates, ranges)
+    if decisive:
+        logger.debug("Answering retrieval from the lexical index")
+        return [doc for doc, _, _ in lexical_docs[:k]]
+
+    embedding = await get_query_embedding_cache().aembed_query(question, vectorstore.embeddings)
+    if mode != HYBRID_MODE or not lexical_docs:
+        return await asyncio.to_thread(_vector_search, vectorstore, embedding, k, ranges)
+
+    vector_docs = await asyncio.to_thread(_vector_search, vectorstore, embedding, candidates, ranges)
+    return reciprocal_rank_fusion(vector_docs, [doc for doc, _, _ in lexical_docs])[:k]
@@ -0,0 +1,101 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of final answers keyed on the question embedding.
+
+    A lookup is a hit when the cosine similarity between the new question and a
+    cached one reaches `threshold`. Entries expire after `ttl_seconds` and the
+    least recently used entry is evicted once `max_entries` is reached.
+    The whole cache is dropped when the index version changes, so answers built
+    from an old FAISS index are never served after a rebuild.
+    """
+
+    def __init__(self, threshold=0.95, ttl_seconds=3600, max_entries=1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.index_version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (vector, answer, created_at)
+        self._next_key = 0
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _check_version(self, index_version):
+        if index_version != self.index_version:
+            if self._entries:
+                logger.info(f"Index version changed ({self.index_version} -> {index_version}), clearing semantic cache")
+            self._entries.clear()
+            self._matrix = None
+            self.index_version = index_version
+
+    def _expire(self):
+        if not self.ttl_seconds:
+            return
+        deadline = time.monotonic() - self.ttl_seconds
+        expired = [key for key, (_, _, created_at) in self._entries.items() if created_at < deadline]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, embedding, index_version):
+        """Return the cached answer for a similar question, or None."""
+        with self._lock:
+            self._check_version(index_version)
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.stack([self._entries[key][0] for key in self._matrix_keys])
+
+            similarities = self._matrix @ self._normalize(embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][1]
+
+    def store(self, embedding, answer, index_version):
+        with self._lock:
+            self._check_version(index_version)
+            self._entries[self._next_key] = (self._normalize(embedding), answer, time.monotonic())
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'index_version': self.index_version,
+        }
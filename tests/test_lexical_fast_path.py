@@ -0,0 +1,75 @@
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from services.compact_index import CompactVectorStore, save_compact
+from services.lexical_index import build_lexical_index, load_lexical_index
+from services.retrieval import lexical_fast_path, retrieve_documents
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+CHUNKS = [
+    ("rh/ferias.txt", "Vacation requests are submitted through the HR portal at least thirty days in advance."),
+    ("rh/ferias.txt", "Unused vacation days can be carried over to the next year with manager approval."),
+    ("rh/reembolso.txt", "Travel expenses are reimbursed with form FR2291 within fifteen days of the trip."),
+    ("ti/acesso.txt", "Badge access to the warehouse is requested from the security department."),
+    ("ti/senha.txt", "Passwords expire every ninety days and must be changed in the intranet portal."),
+    ("geral/politica.txt", "The remote work policy allows two days per week of home office for eligible teams."),
+]
+
+
+def build_store(tmp_path, compact, chunks=CHUNKS):
+    embeddings = CountingEmbeddings(size=16)
+    documents = [Document(page_content=text, metadata={"source": source}) for source, text in chunks]
+    vectorstore = FAISS.from_documents(documents, embeddings)
+    index_dir = str(tmp_path)
+    vectorstore.save_local(index_dir)
+    build_lexical_index(vectorstore, index_dir)
+    if compact:
+        save_compact(vectorstore, index_dir)
+        vectorstore = CompactVectorStore(index_dir, embeddings)
+    vectorstore.lexical_index = load_lexical_index(index_dir)
+    embeddings.calls = 0
+    return vectorstore, embeddings
+
+
+def test_exact_keyword_query_takes_fast_path(tmp_path):
+    vectorstore, embeddings = build_store(tmp_path, compact=False)
+    docs = lexical_fast_path("form FR2291", vectorstore)
+    assert docs is not None
+    assert docs[0].metadata["source"] == "rh/reembolso.txt"
+    assert retrieve_documents("form FR2291", vectorstore)[0].metadata["source"] == "rh/reembolso.txt"
+    assert embeddings.calls == 0
+
+
+def test_single_keyword_query_takes_fast_path_on_compact_store(tmp_path):
+    vectorstore, embeddings = build_store(tmp_path, compact=True)
+    docs = lexical_fast_path("warehouse", vectorstore)
+    assert docs is not None
+    assert docs[0].metadata["source"] == "ti/acesso.txt"
+    assert embeddings.calls == 0
+
+
+def test_ambiguous_query_is_not_decisive(tmp_path):
+    vectorstore, _ = build_store(tmp_path, compact=False)
+    assert lexical_fast_path("days portal", vectorstore) is None
+
+
+def test_single_source_query_needs_a_margin_over_the_next_chunk(tmp_path):
+    chunks = [("Delta_Logistic_Intranet.txt", text) for _, text in CHUNKS]
+    chunks += [
+        ("Delta_Logistic_Intranet.txt", "Delta Logistic was founded in 1998 and operates twelve warehouses."),
+        ("Delta_Logistic_Intranet.txt", "Delta Logistic employees receive the benefits guide on their first day."),
+        ("Delta_Logistic_Intranet.txt", "The Delta Logistic code of conduct applies to every contractor."),
+    ]
+    vectorstore, _ = build_store(tmp_path, compact=False, chunks=chunks)
+    assert lexical_fast_path("Delta Logistic", vectorstore) is None
+    assert lexical_fast_path("form FR2291", vectorstore) is not None
+    assert lexical_fast_path("Delta Logistic", vectorstore, source="Delta_Logistic_Intranet.txt") is None
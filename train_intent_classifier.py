@@ -0,0 +1,131 @@
+"""
+Train the embedding-based intent classifier from logged ClassifyQuestion decisions
+and print an offline accuracy/latency report.
+
+Usage:
+    python train_intent_classifier.py --log logs/classifications.jsonl \
+        --output models/intent_classifier.npz --threshold 0.9
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+
+from services.intent_classifier import EmbeddingIntentClassifier, load_classification_log
+from services.query_embedding_cache import embedding_model_name
+
+
+def split_samples(samples, test_size, seed):
+    """Stratified train/test split so every request type appears in both sets."""
+    rng = random.Random(seed)
+    by_label = {}
+    for question, label in samples:
+        by_label.setdefault(label, []).append(question)
+    train, test = [], []
+    for label, questions in by_label.items():
+        rng.shuffle(questions)
+        n_test = int(len(questions) * test_size) if len(questions) > 1 else 0
+        test.extend((q, label) for q in questions[:n_test])
+        train.extend((q, label) for q in questions[n_test:])
+    return train, test
+
+
+def evaluate(classifier, vectors, labels, threshold):
+    predictions = [classifier.predict(vector) for vector in vectors]
+    correct = [predicted == label for (predicted, _), label in zip(predictions, labels)]
+    confident = [confidence >= threshold for _, confidence in predictions]
+    confident_correct = [c for c, ok in zip(correct, confident) if ok]
+
+    per_class = {}
+    for (predicted, _), label in zip(predictions, labels):
+        stats = per_class.setdefault(label, {'total': 0, 'correct': 0})
+        stats['total'] += 1
+        stats['correct'] += int(predicted == label)
+
+    return {
+        'samples': len(labels),
+        'accuracy': float(np.mean(correct)) if correct else None,
+        'threshold': threshold,
+        'coverage': float(np.mean(confident)) if confident else None,
+        'accuracy_above_threshold': float(np.mean(confident_correct)) if confident_correct else None,
+        'per_class_accuracy': {
+            label: stats['correct'] / stats['total'] for label, stats in per_class.items()
+        },
+    }
+
+
+def measure_latency(classifier, embeddings, questions, repeats=1000):
+    """Time remote embedding per query and local centroid scoring separately."""
+    embed_times = []
+    vector = None
+    for question in questions:
+        start = time.perf_counter()
+        vector = embeddings.embed_query(question)
+        embed_times.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        classifier.predict(vector)
+    classify_ms = (time.perf_counter() - start) / repeats * 1000
+
+    return {
+        'embedding_ms_mean': float(np.mean(embed_times) * 1000) if embed_times else None,
+        'embedding_ms_p95': float(np.percentile(embed_times, 95) * 1000) if embed_times else None,
+        'classify_ms_mean': classify_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default="logs/classifications.jsonl", help="Classification log (JSON lines)")
+    parser.add_argument("--output", default="models/intent_classifier.npz", help="Where to save the model")
+    parser.add_argument("--tiers", default="llm", help="Comma-separated tiers whose decisions are used as labels")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=0.9, help="Confidence threshold for LLM fallback")
+    parser.add_argument("--temperature", type=float, default=0.05)
+    parser.add_argument("--latency-samples", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--report", help="Optional path to write the JSON report")
+    args = parser.parse_args()
+
+    load_dotenv()
+    samples = load_classification_log(args.log, tiers=tuple(args.tiers.split(",")))
+    if not samples:
+        raise SystemExit(f"No labelled samples found in {args.log}")
+    print(f"Loaded {len(samples)} samples: {dict(Counter(label for _, label in samples))}")
+
+    train, test = split_samples(samples, args.test_size, args.seed)
+    embeddings = OpenAIEmbeddings()
+    train_vectors = embeddings.embed_documents([q for q, _ in train])
+    classifier = EmbeddingIntentClassifier(
+        temperature=args.temperature,
+        embedding_model=embedding_model_name(embeddings),
+    ).fit(train_vectors, [label for _, label in train])
+
+    report = {'train_samples': len(train)}
+    if test:
+        test_vectors = embeddings.embed_documents([q for q, _ in test])
+        report['test'] = evaluate(classifier, test_vectors, [label for _, label in test], args.threshold)
+        latency_questions = [q for q, _ in test[:args.latency_samples]]
+    else:
+        latency_questions = [q for q, _ in train[:args.latency_samples]]
+    report['latency'] = measure_latency(classifier, embeddings, latency_questions)
+
+    # The deployed model is refit on every labelled sample.
+    all_vectors = train_vectors + (test_vectors if test else [])
+    classifier.fit(all_vectors, [label for _, label in train + test])
+    classifier.save(args.output)
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()